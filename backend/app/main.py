@@ -1,31 +1,41 @@
-from fastapi import FastAPI, HTTPException, Body, UploadFile, File, Query
+from fastapi import FastAPI, HTTPException, Body, Query, BackgroundTasks, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
+import orjson
 import os
-from tempfile import NamedTemporaryFile
-from pathlib import Path
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from dotenv import load_dotenv
 from typing import Dict, List, Optional
 from .services.organisational_dna_builder import OrganizationalDNAEngine
-from .services.knowledge_graph_builder import KnowledgeGraphBuilder
-from neo4j import GraphDatabase
+from neo4j import AsyncGraphDatabase, READ_ACCESS
 # Import services
 from .services.collection_agent import (
     OTXAgent, CVEAgent, GitHubSecurityAgent, ThreatLandscapeBuilder
 )
 from .services.autonomous_correlation_agent import AutonomousCorrelationAgent
-from .services.pir_generator_main import PIRGenerator
+from .services.pir_generator_main import (
+    PIRGenerator, documents_fingerprint, graph_fingerprint_async, pir_cache_key,
+    get_cached_pirs, cache_pirs
+)
 from .services.simple_pipeline import run_pipeline
 from .services.threat_modeling import generate_threat_model
 from .services.logger_config import logger
 from .services.document_processor import DocumentProcessor
-from .services.session_store import create_session, add_docs, get_docs, clear_session
+from .services.landscape_store import DEFAULT_PARQUET_PATH
+from .services import provider_health
+from .services.session_store import get_docs
+from .services import job_store
+from .routers import upload
 
 load_dotenv()
 
 app = FastAPI(
     title="cAIber API",
     description="Backend services for the cAIber Threat Intelligence Platform.",
-    version="0.6.0"
+    version="0.6.0",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -35,115 +45,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
-ALLOWED = {'.pdf', '.txt', '.docx', '.md'} 
-
-#===================
-# Document Upload
-#===================
-
-@app.post("/documents/start")
-def start_ingest_session():
-    sid = create_session()
-    return {"session_id": sid}
-
-@app.post("/upload")
-async def upload_document(session_id: str = Query(...), file: UploadFile = File(...)):
-    processor = DocumentProcessor()
-    suffix = Path(file.filename).suffix.lower()
-    if suffix not in ALLOWED:
-        raise HTTPException(415, f"Unsupported file type: {suffix}")
-
-    raw = await file.read()
-    with NamedTemporaryFile(delete=True, suffix=suffix) as tmp:
-        tmp.write(raw); tmp.flush()
-        chunks = processor._load_single_document(tmp.name, original_name=file.filename)
-
-    # Save into the session
-    add_docs(session_id, chunks)
-
-    return {
-        "session_id": session_id,
-        "added": len(chunks),
-        "total": len(get_docs(session_id))
-    }
-
-@app.post("/upload-batch")
-async def upload_documents(session_id: str = Query(...), files: List[UploadFile] = File(...)):
-    processor = DocumentProcessor()
-    total = 0
-    for f in files:
-        suffix = Path(f.filename).suffix.lower()
-        if suffix not in ALLOWED:
-            raise HTTPException(415, f"{f.filename}: unsupported file type: {suffix}")
-        raw = await f.read()
-        with NamedTemporaryFile(delete=True, suffix=suffix) as tmp:
-            tmp.write(raw); tmp.flush()
-            chunks = processor._load_single_document(tmp.name, original_name=f.filename)
-            add_docs(session_id, chunks)
-            total += len(chunks)
-
-    return {
-        "session_id": session_id,
-        "added": total,
-        "total": len(get_docs(session_id))
-    }
-
-
-ALLOWED = {'.pdf', '.txt', '.docx', '.md'} 
-
-#===================
-# Document Upload
-#===================
-
-@app.post("/documents/start")
-def start_ingest_session():
-    sid = create_session()
-    return {"session_id": sid}
-
-@app.post("/upload")
-async def upload_document(session_id: str = Query(...), file: UploadFile = File(...)):
-    processor = DocumentProcessor()
-    suffix = Path(file.filename).suffix.lower()
-    if suffix not in ALLOWED:
-        raise HTTPException(415, f"Unsupported file type: {suffix}")
-
-    raw = await file.read()
-    with NamedTemporaryFile(delete=True, suffix=suffix) as tmp:
-        tmp.write(raw); tmp.flush()
-        chunks = processor._load_single_document(tmp.name, original_name=file.filename)
-
-    # Save into the session
-    add_docs(session_id, chunks)
-
-    return {
-        "session_id": session_id,
-        "added": len(chunks),
-        "total": len(get_docs(session_id))
-    }
-
-@app.post("/upload-batch")
-async def upload_documents(session_id: str = Query(...), files: List[UploadFile] = File(...)):
-    processor = DocumentProcessor()
-    total = 0
-    for f in files:
-        suffix = Path(f.filename).suffix.lower()
-        if suffix not in ALLOWED:
-            raise HTTPException(415, f"{f.filename}: unsupported file type: {suffix}")
-        raw = await f.read()
-        with NamedTemporaryFile(delete=True, suffix=suffix) as tmp:
-            tmp.write(raw); tmp.flush()
-            chunks = processor._load_single_document(tmp.name, original_name=f.filename)
-            add_docs(session_id, chunks)
-            total += len(chunks)
-
-    return {
-        "session_id": session_id,
-        "added": total,
-        "total": len(get_docs(session_id))
-    }
-
+app.include_router(upload.router)
 
 # Global Neo4j driver
 neo4j_driver = None
@@ -152,17 +57,31 @@ neo4j_driver = None
 async def startup_event():
     """Initialize connections on startup"""
     global neo4j_driver
+    # Stateless after construction, so one splitter/loader set serves every upload
+    app.state.doc_processor = DocumentProcessor()
+    # Upload parsing runs here; CAIBER_PARSE_WORKERS=0 parses on threads instead
+    parse_workers = int(os.getenv("CAIBER_PARSE_WORKERS", os.cpu_count() or 1))
+    app.state.parse_pool = ProcessPoolExecutor(max_workers=parse_workers) if parse_workers > 0 else None
+    app.state.pir_generator = None
     try:
         neo4j_uri = os.getenv("NEO4J_URI", "neo4j+ssc://cc633ab6.databases.neo4j.io")
         neo4j_user = os.getenv("NEO4J_USERNAME", "neo4j")
         neo4j_password = os.getenv("NEO4J_PASSWORD")
         
-        neo4j_driver = GraphDatabase.driver(neo4j_uri, auth=(neo4j_user, neo4j_password))
+        neo4j_driver = AsyncGraphDatabase.driver(
+            neo4j_uri,
+            auth=(neo4j_user, neo4j_password),
+            max_connection_pool_size=int(os.getenv("NEO4J_POOL", "32")),
+            connection_acquisition_timeout=30,
+            keep_alive=True
+        )
         
-        # Test the connection
-        with neo4j_driver.session() as session:
-            result = session.run("RETURN 1 as test")
-            result.single()
+        # Pooled connectivity check instead of a dedicated probe session
+        await neo4j_driver.verify_connectivity()
+        # Lets the org-DNA view's ORDER BY confidence LIMIT use an index instead of a label scan
+        await neo4j_driver.execute_query(
+            "CREATE INDEX entity_confidence IF NOT EXISTS FOR (n:Entity) ON (n.confidence)"
+        )
         
         logger.info("✅ Neo4j connection established on startup")
     except Exception as e:
@@ -171,32 +90,59 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """Close connections on shutdown"""
-    global neo4j_driver
+    global neo4j_driver, _correlation_agent
     if neo4j_driver:
-        neo4j_driver.close()
+        await neo4j_driver.close()
         logger.info("🔌 Neo4j connection closed")
+    if _correlation_agent:
+        _correlation_agent.close()
+        _correlation_agent = None
+        logger.info("🔌 Correlation agent closed")
+    parse_pool = getattr(app.state, "parse_pool", None)
+    if parse_pool:
+        parse_pool.shutdown(cancel_futures=True)
+        app.state.parse_pool = None
+    pir_gen = getattr(app.state, "pir_generator", None)
+    if pir_gen:
+        pir_gen.close()
+        app.state.pir_generator = None
+
+
+# Shared correlation agent (one Neo4j driver + LLM agent for all requests)
+_correlation_agent: Optional[AutonomousCorrelationAgent] = None
+_correlation_agent_lock = threading.Lock()
+
+def get_correlation_agent() -> AutonomousCorrelationAgent:
+    """Lazily build the process-wide correlation agent on first use."""
+    global _correlation_agent
+    if _correlation_agent is None:
+        with _correlation_agent_lock:
+            if _correlation_agent is None:
+                _correlation_agent = AutonomousCorrelationAgent()
+    return _correlation_agent
+
+_pir_generator_lock = threading.Lock()
+
+def get_pir_generator() -> PIRGenerator:
+    """Reuse one PIRGenerator (LLM client, driver, LangChain graph) across requests.
+    A generator that fell back to mock data is rebuilt so a recovered Neo4j is picked up."""
+    pir_gen = getattr(app.state, "pir_generator", None)
+    if pir_gen is None or pir_gen.use_mock:
+        with _pir_generator_lock:
+            pir_gen = getattr(app.state, "pir_generator", None)
+            if pir_gen is None or pir_gen.use_mock:
+                pir_gen = app.state.pir_generator = PIRGenerator()
+    return pir_gen
 
 # ================================
 # Stage 1: PIR Generation
 # ================================
 
-@app.post("/generate-pirs", status_code=200)
-def generate_pirs(payload: dict = Body(...)):
-    """
-    Stage 1: Generate PIRs after org DNA build from uploaded docs.
-    Body: { "session_id": "...", "clear_existing": false }
-    """
-    session_id = payload.get("session_id")
-    if not session_id:
-        raise HTTPException(400, "session_id is required")
-
-    docs = get_docs(session_id)
-    if not docs:
-        raise HTTPException(400, "No uploaded documents found for this session_id")
-
+def _build_dna_and_generate_pirs(docs, clear_existing: bool) -> Dict:
+    """Blocking Stage 1 work (DNA build + LLM PIR generation), run off the event loop."""
     # Try to build Organizational DNA first (upload-only)
     try:
-        print("🔍 Building Organizational DNA from uploaded files")
+        logger.info("🔍 Building Organizational DNA from uploaded files")
         org_gen = OrganizationalDNAEngine(
             neo4j_uri=os.getenv("NEO4J_URI"),
             neo4j_user=os.getenv("NEO4J_USERNAME"),
@@ -204,25 +150,81 @@ def generate_pirs(payload: dict = Body(...)):
         )
         org_gen.build_organizational_dna(
             documents=docs,
-            clear_existing=bool(payload.get("clear_existing", False)),
+            clear_existing=clear_existing,
         )
-        print("✅ Organizational DNA built successfully")
+        logger.info("✅ Organizational DNA built successfully")
     except Exception as neo4j_error:
-        print(f"❌ Neo4j connection failed: {neo4j_error}")
-        print("⚠️  Falling back to mock data mode")
+        logger.error(f"❌ Neo4j connection failed: {neo4j_error}")
+        logger.warning("⚠️  Falling back to mock data mode")
 
     # Generate PIRs (Neo4j-backed if available; else mock)
-    pir_gen = PIRGenerator()
-    result = pir_gen.generate_pirs()
+    pir_gen = get_pir_generator()
+    if pir_gen.graph is not None:
+        # The DNA build may have added labels/relationships since the schema was cached
+        pir_gen.graph.refresh_schema()
+    return pir_gen.generate_pirs()
+
+
+@app.post("/generate-pirs", status_code=200, response_model=None)
+async def generate_pirs(request: Request, response: Response, payload: dict = Body(...)):
+    """
+    Stage 1: Generate PIRs after org DNA build from uploaded docs.
+    Body: { "session_id": "...", "clear_existing": false }
+    Memoized results carry an ETag; send it back as If-None-Match to get a bodiless 304.
+    """
+    session_id = payload.get("session_id")
+    if not session_id:
+        raise HTTPException(400, "session_id is required")
+
+    docs = get_docs(session_id)
+    if not docs:
+        raise HTTPException(400, "No uploaded documents found for this session_id")
+
+    clear_existing = bool(payload.get("clear_existing", False))
+    docs_key = documents_fingerprint(docs)
+
+    # Unchanged uploads against an unchanged graph: skip the DNA rebuild and LLM call
+    if not clear_existing:
+        key = pir_cache_key(docs_key, await graph_fingerprint_async(neo4j_driver))
+        cached = get_cached_pirs(key)
+        if cached:
+            etag = f'"{key}"'
+            if request.headers.get("if-none-match") == etag:
+                return Response(status_code=304, headers={"ETag": etag})
+            logger.info("♻️  Returning memoized PIRs (documents and graph unchanged)")
+            response.headers["ETag"] = etag
+            return cached
+
+    result = await asyncio.to_thread(_build_dna_and_generate_pirs, docs, clear_existing)
 
     if not result.get("success", True):
         raise HTTPException(status_code=500, detail=result.get("error", "PIR generation failed"))
 
+    if not result.get("mock_data"):
+        key = pir_cache_key(docs_key, await graph_fingerprint_async(neo4j_driver))
+        cache_pirs(key, result)
+        if key:
+            response.headers["ETag"] = f'"{key}"'
+
     return result
 
 
-@app.get("/api/organizational-dna", status_code=200)
-def get_organizational_dna(
+# Visualization color per entity type
+ENTITY_COLOR_MAP = {
+    'technology': '#14b8a6',
+    'organization': '#0ea5e9',
+    'geography': '#f59e0b',
+    'threat_actor': '#ef4444',
+    'vulnerability': '#dc2626',
+    'business_initiative': '#8b5cf6',
+    'business_asset': '#a855f7',
+    'compliance_requirement': '#f97316',
+    'financial_data': '#22c55e'
+}
+DEFAULT_ENTITY_COLOR = '#6b7280'
+
+@app.get("/api/organizational-dna", status_code=200, response_model=None)
+async def get_organizational_dna(
     node_types: Optional[List[str]] = Query(None, description="Filter by node types (e.g., technology, business_asset)"),
     relationship_types: Optional[List[str]] = Query(None, description="Filter by relationship types (e.g., USES_TECHNOLOGY, HOSTS)"),
     focus_node: Optional[str] = Query(None, description="Focus on specific node and its connections"),
@@ -244,11 +246,8 @@ def get_organizational_dna(
         if not neo4j_driver:
             raise HTTPException(status_code=503, detail="Neo4j connection not available")
         
-        nodes = []
-        links = []
-        node_map = {}  # To track unique nodes
-        
-        with neo4j_driver.session() as session:
+        # Read-only, and records stream in fetch_size batches instead of buffering whole results
+        async with neo4j_driver.session(fetch_size=1000, default_access_mode=READ_ACCESS) as session:
             # Build dynamic query based on filters
             query_params = {}
             
@@ -262,11 +261,7 @@ def get_organizational_dna(
                     OPTIONAL MATCH path = (focus)-[*0..{depth_limit}]-(connected:Entity)
                     WITH DISTINCT connected AS n
                     WHERE n IS NOT NULL
-                    RETURN n.id AS id,
-                           n.name AS label,
-                           n.type AS type,
-                           n.confidence AS confidence,
-                           n.importance AS importance
+                    RETURN n
                     ORDER BY n.confidence DESC
                     LIMIT 200
                 """
@@ -287,11 +282,7 @@ def get_organizational_dna(
                         UNWIND nodes AS node
                         WITH DISTINCT node
                         WHERE node IS NOT NULL
-                        RETURN node.id AS id,
-                               node.name AS label,
-                               node.type AS type,
-                               node.confidence AS confidence,
-                               node.importance AS importance
+                        RETURN node AS n
                         ORDER BY 
                             CASE WHEN node.type IN $node_types THEN 0 ELSE 1 END,
                             node.confidence DESC
@@ -308,11 +299,7 @@ def get_organizational_dna(
                         UNWIND nodes AS node
                         WITH DISTINCT node
                         WHERE node IS NOT NULL
-                        RETURN node.id AS id,
-                               node.name AS label,
-                               node.type AS type,
-                               node.confidence AS confidence,
-                               node.importance AS importance
+                        RETURN node AS n
                         ORDER BY 
                             CASE WHEN node.type IN $node_types THEN 0 ELSE 1 END,
                             node.confidence DESC
@@ -328,11 +315,7 @@ def get_organizational_dna(
                         UNWIND nodes AS node
                         WITH DISTINCT node
                         WHERE node IS NOT NULL
-                        RETURN node.id AS id,
-                               node.name AS label,
-                               node.type AS type,
-                               node.confidence AS confidence,
-                               node.importance AS importance
+                        RETURN node AS n
                         ORDER BY node.confidence DESC
                         LIMIT 200
                     """
@@ -340,84 +323,53 @@ def get_organizational_dna(
                     # No filtering - return all nodes
                     node_query = """
                         MATCH (n:Entity)
-                        RETURN n.id AS id, 
-                               n.name AS label, 
-                               n.type AS type,
-                               n.confidence AS confidence,
-                               n.importance AS importance
+                        RETURN n
                         ORDER BY n.confidence DESC
                         LIMIT 200
                     """
             
-            result = session.run(node_query, query_params)
-            
-            # Define color mapping for different entity types
-            color_map = {
-                'technology': '#14b8a6',
-                'organization': '#0ea5e9', 
-                'geography': '#f59e0b',
-                'threat_actor': '#ef4444',
-                'vulnerability': '#dc2626',
-                'business_initiative': '#8b5cf6',
-                'business_asset': '#a855f7',
-                'compliance_requirement': '#f97316',
-                'financial_data': '#22c55e'
-            }
-            
-            for record in result:
-                node_id = record['id']
-                node_type = record['type']
-                
-                # Calculate node size based on confidence and importance
-                confidence = record['confidence'] or 0.5
-                importance = record['importance'] or 5
-                size = int(10 + (confidence * 10) + (importance * 2))
-                
-                node = {
-                    'id': node_id,
-                    'label': record['label'],
-                    'type': node_type,
-                    'size': size,
-                    'color': color_map.get(node_type, '#6b7280')
-                }
-                nodes.append(node)
-                node_map[node_id] = node
-            
-            # Build relationship query with filtering
-            rel_where_clauses = ["source.id IN $node_ids", "target.id IN $node_ids"]
+            # Nodes and the links among them in one round-trip: the node selection runs as a
+            # subquery and relationships are matched against the collected set server-side
+            rel_filter = " AND type(r) IN $relationship_types" if relationship_types else ""
             if relationship_types:
-                rel_where_clauses.append("type(r) IN $relationship_types")
                 query_params['relationship_types'] = relationship_types
-            
-            query_params['node_ids'] = list(node_map.keys())
-            
-            rel_where_clause = " AND ".join(rel_where_clauses)
-            
-            relationship_query = f"""
-                MATCH (source:Entity)-[r]->(target:Entity)
-                WHERE {rel_where_clause}
-                RETURN source.id AS source, 
-                       target.id AS target, 
-                       type(r) AS relationship_type,
-                       r.confidence AS confidence
-                LIMIT 500
+            graph_query = f"""
+                CALL {{
+                    {node_query}
+                }}
+                WITH collect(n) AS ns
+                CALL {{
+                    WITH ns
+                    UNWIND ns AS source
+                    MATCH (source)-[r]->(target:Entity)
+                    WHERE target IN ns{rel_filter}
+                    WITH r, source, target LIMIT 500
+                    RETURN collect({{
+                        source: source.id,
+                        target: target.id,
+                        value: toInteger(CASE WHEN coalesce(r.confidence, 0) = 0 THEN 0.5 ELSE r.confidence END * 5),
+                        type: type(r)
+                    }}) AS links
+                }}
+                RETURN [n IN ns | {{
+                    id: n.id,
+                    label: n.name,
+                    type: n.type,
+                    size: toInteger(10 + CASE WHEN coalesce(n.confidence, 0) = 0 THEN 0.5 ELSE n.confidence END * 10
+                                   + CASE WHEN coalesce(n.importance, 0) = 0 THEN 5 ELSE n.importance END * 2),
+                    color: coalesce($entity_colors[n.type], $default_color)
+                }}] AS nodes, links
             """
+            # Size (confidence/importance) and color are projected server-side, so the
+            # records are already in the visualization shape. A missing or zero confidence/importance
+            # falls back to the default, as the Python `or` defaults did.
+            query_params['entity_colors'] = ENTITY_COLOR_MAP
+            query_params['default_color'] = DEFAULT_ENTITY_COLOR
             
-            result = session.run(relationship_query, query_params)
-            
-            for record in result:
-                source_id = record['source']
-                target_id = record['target']
-                
-                # Only include links where both nodes exist
-                if source_id in node_map and target_id in node_map:
-                    confidence = record['confidence'] or 0.5
-                    links.append({
-                        'source': source_id,
-                        'target': target_id,
-                        'value': int(confidence * 5),  # Link thickness based on confidence
-                        'type': record['relationship_type']
-                    })
+            result = await session.run(graph_query, query_params)
+            record = await result.single()
+            nodes = record['nodes']
+            links = record['links']
         
         # Driver is managed globally, no need to close
         
@@ -430,7 +382,7 @@ def get_organizational_dna(
         # Check if we have any data
         has_data = len(nodes) > 0
         
-        return {
+        return ORJSONResponse({
             'nodes': nodes,
             'links': links,
             'has_data': has_data,
@@ -446,7 +398,7 @@ def get_organizational_dna(
                 'business_assets': node_types.get('business_asset', 0),
                 'compliance': node_types.get('compliance_requirement', 0)
             }
-        }
+        })
         
     except Exception as e:
         logger.error(f"Failed to fetch organizational DNA: {str(e)}")
@@ -457,51 +409,123 @@ def get_organizational_dna(
 # Stage 2: Threat Collection
 # ================================
 
-@app.post("/collect-threats", status_code=200)
-def collect_threats(pir_keywords: dict):
+# Landscape and assessment payloads are plain JSON-native dicts (STIX-shaped dicts built
+# directly by the collection agents), so the large endpoints return ORJSONResponse directly and skip jsonable_encoder.
+
+def _ndjson_response(lines) -> StreamingResponse:
+    """Serialize an (async) iterable of dicts as newline-delimited JSON without buffering the whole body."""
+    if hasattr(lines, "__aiter__"):
+        body = (orjson.dumps(line) + b"\n" async for line in lines)
+    else:
+        body = (orjson.dumps(line) + b"\n" for line in lines)
+    return StreamingResponse(body, media_type="application/x-ndjson")
+
+
+def _landscape_lines(landscape: dict):
+    """Summary line first (everything except the item lists), then one line per threat."""
+    yield {k: v for k, v in landscape.items() if k not in ("indicators", "vulnerabilities")}
+    yield from landscape.get("vulnerabilities", [])
+    yield from landscape.get("indicators", [])
+
+
+def _build_landscape_builder(pir_keywords: dict, items_per_search: int = 50) -> ThreatLandscapeBuilder:
+    """Configure the collection agents (OTX only when keyed) around one landscape builder."""
+    otx_api_key = os.getenv("OTX_API_KEY")
+    github_token = os.getenv("GITHUB_TOKEN")
+    nvd_api_key = os.getenv("NVD_API_KEY")
+
+    # Pass PIR keywords into agents
+    agents = [
+        CVEAgent(api_key=nvd_api_key, keywords=pir_keywords),
+        GitHubSecurityAgent(github_token=github_token, keywords=pir_keywords)
+    ]
+    if otx_api_key:
+        agents.append(OTXAgent(api_key=otx_api_key, keywords=pir_keywords))
+    for agent in agents:
+        agent.items_per_search = items_per_search
+
+    return ThreatLandscapeBuilder(agents, pir_keywords=pir_keywords)
+
+
+@app.post("/collect-threats", status_code=200, response_model=None)
+async def collect_threats(
+    pir_keywords: dict,
+    concurrent_searches: int = Query(8, ge=1, description="Maximum agents collecting at the same time"),
+    items_per_search: int = Query(50, ge=1, le=100, description="Items requested from each feed"),
+    stream: bool = Query(False, description="Stream the landscape as NDJSON, one threat per line"),
+    export_parquet: bool = Query(False, description="Also write the landscape as a Parquet table (requires pyarrow)"),
+):
     """
     Stage 2: Run collection agents (OTX, CVE, GitHub)
     to build threat landscape filtered by PIR keywords.
     Accepts keyword dict with categories like technologies, geographies, etc.
     """
     try:
-        otx_api_key = os.getenv("OTX_API_KEY")
-        github_token = os.getenv("GITHUB_TOKEN")
-        nvd_api_key = os.getenv("NVD_API_KEY")
-
-        # Flatten dict into one keyword set
-        # Pass PIR keywords into agents
-        agents = [
-            CVEAgent(api_key=nvd_api_key, keywords=pir_keywords),
-            GitHubSecurityAgent(github_token=github_token, keywords=pir_keywords)
-        ]
-        if otx_api_key:
-            agents.append(OTXAgent(api_key=otx_api_key, keywords=pir_keywords))
-
-        builder = ThreatLandscapeBuilder(agents, pir_keywords=pir_keywords)
-        landscape = builder.build_threat_landscape()
-        return {"landscape": landscape}
+        builder = _build_landscape_builder(pir_keywords, items_per_search)
+        if export_parquet:
+            builder.parquet_path = DEFAULT_PARQUET_PATH
+        landscape = await builder.build_threat_landscape_async(concurrent_searches=concurrent_searches)
+        if stream:
+            return _ndjson_response(_landscape_lines(landscape))
+        return ORJSONResponse({"landscape": landscape})
 
     except HTTPException as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/collect-and-correlate", status_code=200)
-def collect_and_correlate(pir_keywords: Dict[str, List[str]] = Body(...)):
+@app.get("/provider-health", status_code=200)
+def get_provider_health():
+    """Rolling error rate and latency per threat feed provider, as used by the collection health gate."""
+    return {"providers": provider_health.snapshot()}
+
+COLLECT_AND_CORRELATE_STAGES = 2  # 1: collect, 2: correlate
+
+async def _collect_and_correlate_job(job_id: str, pir_keywords: Dict[str, List[str]]):
+    """Background collect-and-correlate run, reporting progress to the job store."""
+    try:
+        job_store.update_stage(job_id, 1, stage_name="collect")
+        builder = _build_landscape_builder(pir_keywords)
+        agent = await asyncio.to_thread(get_correlation_agent)
+
+        assessments = []
+        async for assessment in agent.correlate_stream(builder.stream_threats()):
+            assessments.append(assessment)
+            job_store.update_stage(job_id, 2, {"assessed": len(assessments)}, stage_name="correlate")
+        assessments.sort(key=lambda x: x.get('risk_score', 0), reverse=True)
+
+        job_store.complete_job(job_id, {"assessments": assessments})
+    except Exception as e:
+        logger.error(f"Collect-and-correlate job {job_id} failed: {str(e)}", exc_info=True)
+        job_store.fail_job(job_id, str(e))
+
+
+@app.post("/collect-and-correlate", status_code=200, response_model=None)
+async def collect_and_correlate(
+    background_tasks: BackgroundTasks,
+    pir_keywords: Dict[str, List[str]] = Body(...),
+    run_async: bool = Query(False, alias="async")
+):
     """
-    Run Stage 2 (collect threats) and immediately feed
-    the full threat landscape into Stage 3 (correlate).
+    Run Stage 2 (collect threats) and feed threats into Stage 3 (correlate)
+    as each collection agent finishes, without building the full landscape.
+    With async=true, return a job_id immediately; follow /jobs/{job_id}/events
+    for progress and the final assessments.
     """
+    if run_async:
+        job_id = job_store.create_job(stages=COLLECT_AND_CORRELATE_STAGES)
+        background_tasks.add_task(_collect_and_correlate_job, job_id, pir_keywords)
+        return {"success": True, "job_id": job_id, "status": "queued"}
+
     try:
-        # Stage 2: Collect threats
-        response = collect_threats(pir_keywords)
-        landscape = response["landscape"]
+        builder = _build_landscape_builder(pir_keywords)
+        agent = await asyncio.to_thread(get_correlation_agent)
 
-        # Stage 3: Correlate using the collected landscape
-        agent = AutonomousCorrelationAgent()
-        assessments = agent.correlate_threats(landscape)
-        agent.close()
+        assessments = [
+            assessment
+            async for assessment in agent.correlate_stream(builder.stream_threats())
+        ]
+        assessments.sort(key=lambda x: x.get('risk_score', 0), reverse=True)
 
-        return {"assessments": assessments}
+        return ORJSONResponse({"assessments": assessments})
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -510,21 +534,28 @@ def collect_and_correlate(pir_keywords: Dict[str, List[str]] = Body(...)):
 # ================================
 # Stage 3: Correlation Agent
 # ================================
-@app.post("/correlate-threats", status_code=200)
-def correlate_threats(threat_landscape: dict):
+@app.post("/correlate-threats", status_code=200, response_model=None)
+async def correlate_threats(threat_landscape: dict, stream: bool = Query(False, description="Stream assessments as NDJSON")):
     """
     Stage 3: Correlate threats with organizational DNA from Neo4j.
     Input is threat_landscape from Stage 2.
     """
     try:
-        agent = AutonomousCorrelationAgent()
-        assessments = agent.correlate_threats(threat_landscape)
-        agent.close()
-        return {"assessments": assessments}
+        agent = await asyncio.to_thread(get_correlation_agent)
+        if stream:
+            # One line per assessment as soon as its agent run finishes (unsorted)
+            return _ndjson_response(agent.correlate_threats_stream(threat_landscape))
+        assessments = await asyncio.to_thread(agent.correlate_threats, threat_landscape)
+        return ORJSONResponse({"assessments": assessments})
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/correlate-stream", status_code=200, response_model=None)
+async def correlate_threats_stream(threat_landscape: dict):
+    """Stage 3 as NDJSON: same as /correlate-threats?stream=true."""
+    return await correlate_threats(threat_landscape, stream=True)
+
 @app.post("/generate-threat-model", status_code=200)
 async def get_comprehensive_threat_model(intelligence_data: dict = Body(...)):
     """
@@ -589,13 +620,39 @@ async def get_comprehensive_threat_model(intelligence_data: dict = Body(...)):
 # ================================
 # Complete Pipeline (Uses simple_pipeline.py)
 # ================================
-@app.post("/run-complete-pipeline", status_code=200)
-def run_complete_pipeline(skip_stage1: bool = False, autonomous_correlation: bool = False):
+def _run_pipeline_job(job_id: str, skip_stage1: bool, autonomous_correlation: bool):
+    """Execute the pipeline for a background job, recording per-stage progress in the job store."""
+    try:
+        result = run_pipeline(
+            skip_stage1=skip_stage1,
+            autonomous_correlation=autonomous_correlation,
+            on_stage=lambda stage, partial=None: job_store.update_stage(job_id, stage, partial)
+        )
+        job_store.complete_job(job_id, result)
+    except Exception as e:
+        logger.error(f"Pipeline job {job_id} failed: {str(e)}", exc_info=True)
+        job_store.fail_job(job_id, str(e))
+
+
+@app.post("/run-complete-pipeline", status_code=200, response_model=None)
+def run_complete_pipeline(
+    background_tasks: BackgroundTasks,
+    skip_stage1: bool = False,
+    autonomous_correlation: bool = False,
+    background: bool = False
+):
     """
     Run the complete 4-stage cAIber pipeline using simple_pipeline.py.
     - skip_stage1: Skip Organizational DNA building (faster demo mode)
     - autonomous_correlation: Use AI agent for correlation instead of standard
+    - background: Return a job_id immediately and run the pipeline in the background;
+      poll /pipeline-status/{job_id} for progress and results
     """
+    if background:
+        job_id = job_store.create_job()
+        background_tasks.add_task(_run_pipeline_job, job_id, skip_stage1, autonomous_correlation)
+        return {"success": True, "job_id": job_id, "status": "queued"}
+
     try:
         result = run_pipeline(
             skip_stage1=skip_stage1,
@@ -609,6 +666,52 @@ def run_complete_pipeline(skip_stage1: bool = False, autonomous_correlation: boo
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/pipeline-status/{job_id}", status_code=200)
+def pipeline_status(job_id: str):
+    """Report stage, progress and partial results of a background pipeline run."""
+    job = job_store.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job_id")
+    return job
+
+
+JOB_EVENT_POLL_INTERVAL = 0.5  # seconds
+
+async def _job_events(job_id: str):
+    """Server-Sent Events for a background job: one event per job-store update, ending
+    with a completed/failed event that carries the result or error."""
+    last_update = None
+    while True:
+        job = job_store.get_job(job_id)
+        if job is None:
+            return
+        if job["updated_at"] != last_update:
+            last_update = job["updated_at"]
+            terminal = job["status"] in job_store.TERMINAL_STATUSES
+            fields = ("job_id", "status", "stage", "stage_name", "progress", "partial_result")
+            payload = {key: job[key] for key in fields}
+            if terminal:
+                payload["result"] = job["result"]
+                payload["error"] = job["error"]
+            event = job["status"] if terminal else "stage"
+            yield b"event: " + event.encode() + b"\ndata: " + orjson.dumps(payload) + b"\n\n"
+            if terminal:
+                return
+        await asyncio.sleep(JOB_EVENT_POLL_INTERVAL)
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Stream progress of a background job (pipeline or collect-and-correlate) as SSE."""
+    if job_store.get_job(job_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown job_id")
+    return StreamingResponse(
+        _job_events(job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.post("/threat-model", status_code=200)
 def threat_model_endpoint(intelligence_data: dict):
     """
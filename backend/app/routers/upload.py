@@ -0,0 +1,107 @@
+"""
+routers/upload.py
+Document upload endpoints: per-session ingestion of files into parsed chunks (cAIber Stage 1)
+"""
+
+import asyncio
+import hashlib
+import os
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import List, Tuple
+
+from fastapi import APIRouter, File, HTTPException, Query, Request, UploadFile
+
+from ..services.document_processor import (
+    load_in_worker, parsed_cache_key, get_cached_chunks, cache_chunks
+)
+from ..services.session_store import create_session, add_docs, add_docs_batch, get_docs
+
+router = APIRouter()
+
+ALLOWED = {'.pdf', '.txt', '.docx', '.md'}
+
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+async def _spool_upload(file: UploadFile, suffix: str) -> Tuple[str, str, int]:
+    """Copy an upload to a temp file chunk by chunk so large files never sit in memory whole,
+    hashing the bytes in the same pass (no re-read for the digest). delete=False keeps the
+    path reopenable by the loaders on Windows; callers unlink it.
+    Returns (temp path, content digest, size in bytes)."""
+    digest = hashlib.blake2b(digest_size=32)
+    size = 0
+    with NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+            tmp.write(chunk)
+            size += len(chunk)
+        tmp.flush()
+    return tmp.name, digest.hexdigest(), size
+
+async def _parse_upload(request: Request, tmp_path: str, filename: str) -> list:
+    """Parse and chunk a spooled upload on the worker process pool (pypdf/docx parsing is
+    CPU-bound and would hold the GIL); without a pool, fall back to a thread."""
+    pool = getattr(request.app.state, "parse_pool", None)
+    if pool is None:
+        return await asyncio.to_thread(
+            request.app.state.doc_processor._load_single_document, tmp_path, original_name=filename
+        )
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(pool, load_in_worker, tmp_path, filename)
+
+async def _ingest_one(request: Request, file: UploadFile) -> Tuple[list, dict]:
+    """Spool one upload to disk and parse it off the event loop, reusing the chunks of an
+    identical file parsed earlier. Returns (chunks, file summary for the response)."""
+    tmp_path, content_digest, size = await _spool_upload(file, Path(file.filename).suffix.lower())
+    try:
+        key = parsed_cache_key(content_digest, file.filename)
+        chunks = get_cached_chunks(key)
+        if chunks is None:
+            chunks = await _parse_upload(request, tmp_path, file.filename)
+            cache_chunks(key, chunks)
+        return chunks, {"file_name": file.filename, "digest": content_digest, "bytes": size, "added": len(chunks)}
+    finally:
+        os.unlink(tmp_path)
+
+@router.post("/documents/start")
+def start_ingest_session():
+    sid = create_session()
+    return {"session_id": sid}
+
+@router.post("/upload")
+async def upload_document(request: Request, session_id: str = Query(...), file: UploadFile = File(...)):
+    suffix = Path(file.filename).suffix.lower()
+    if suffix not in ALLOWED:
+        raise HTTPException(415, f"Unsupported file type: {suffix}")
+
+    chunks, summary = await _ingest_one(request, file)
+
+    # Save into the session
+    add_docs(session_id, chunks)
+
+    return {
+        "session_id": session_id,
+        "added": len(chunks),
+        "total": len(get_docs(session_id)),
+        # Content digest doubles as a client-side idempotency key
+        "digest": summary["digest"],
+        "bytes": summary["bytes"]
+    }
+
+@router.post("/upload-batch")
+async def upload_documents(request: Request, session_id: str = Query(...), files: List[UploadFile] = File(...)):
+    for f in files:
+        suffix = Path(f.filename).suffix.lower()
+        if suffix not in ALLOWED:
+            raise HTTPException(415, f"{f.filename}: unsupported file type: {suffix}")
+
+    # Parse all files concurrently; add to the session afterwards so chunk order follows upload order
+    results = await asyncio.gather(*[_ingest_one(request, f) for f in files])
+    total = add_docs_batch(session_id, [chunks for chunks, _ in results])
+
+    return {
+        "session_id": session_id,
+        "added": total,
+        "total": len(get_docs(session_id)),
+        "files": [summary for _, summary in results]
+    }
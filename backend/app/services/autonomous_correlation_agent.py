@@ -5,8 +5,18 @@ The agent decides which tools to use for risk assessment
 
 import os
 import json
-from typing import Dict, Any, List
-from neo4j import GraphDatabase
+import re
+import asyncio
+import heapq
+import threading
+import time
+from types import MappingProxyType
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from threading import Lock
+from typing import Dict, Any, List, AsyncIterator, Callable, Final, Iterator
+import orjson
+from neo4j import GraphDatabase, READ_ACCESS
 from langchain_openai import ChatOpenAI
 from langchain.agents import create_openai_tools_agent, AgentExecutor
 from langchain.tools import Tool
@@ -14,12 +24,167 @@ from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from dotenv import load_dotenv
 try:
     from .logger_config import logger
+    from .pir_generator_main import graph_fingerprint
+    from .keyword_matcher import KeywordMatcher
 except ImportError:
     from logger_config import logger
+    from pir_generator_main import graph_fingerprint
+    from keyword_matcher import KeywordMatcher
 
 load_dotenv()
 
 
+# Threats per agent run in assess_threats_batch
+ASSESSMENT_BATCH_SIZE = 5
+
+SYSTEM_PROMPT: Final[str] = """You are a cybersecurity risk assessment expert. Your job is to analyze threats
+against our organization's context and determine risk levels.
+
+Use the available tools to investigate:
+1. Whether the threat affects our technologies
+2. If it targets our geographic regions
+3. Which critical assets could be impacted
+4. How it relates to our business initiatives
+
+For each threat, provide a risk assessment with:
+- Risk Score (1-10)
+- Affected Assets
+- Business Impact
+- Reasoning
+
+Be thorough but efficient. Use tools to gather context, then make your assessment.
+Respond with a single JSON object."""
+
+# Built once per process; every agent instance shares the parsed template
+AGENT_PROMPT: Final = ChatPromptTemplate.from_messages([
+    ("system", SYSTEM_PROMPT),
+    ("user", "{input}"),
+    MessagesPlaceholder(variable_name="agent_scratchpad")
+])
+
+# Tool name -> description; each tool is backed by the agent method _<name>
+TOOL_DESCRIPTIONS: Final = MappingProxyType({
+    "search_technologies": "Search for specific technologies in our organization's knowledge graph. Input: technology name (e.g., 'AWS', 'Python')",
+    "get_critical_assets": "Get list of critical assets and systems in our organization",
+    "check_geographic_presence": "Check if we have presence in a specific geographic location. Input: location name",
+    "find_related_entities": "Find entities related to a specific keyword. Input: keyword",
+    "get_business_initiatives": "Get our current business initiatives and projects",
+})
+
+# Vulnerabilities below this CVSS that mention no org entity skip the LLM agent
+TRIAGE_CVSS_THRESHOLD = 7.0
+
+# Tool results are reused for this long (seconds), and at most this many are kept
+TOOL_CACHE_TTL = float(os.getenv("CAIBER_TOOL_CACHE_TTL", "300"))
+TOOL_CACHE_SIZE = 1024
+
+
+# Agent replies often wrap JSON in a ```json fence and surrounding prose
+_FENCED_JSON_RE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+_JSON_OBJECT_RE = re.compile(r"\{.*\}", re.DOTALL)
+_JSON_ARRAY_RE = re.compile(r"\[.*\]", re.DOTALL)
+
+
+def _extract_json(output: str, pattern: re.Pattern) -> Any:
+    """Parse the outermost JSON object/array (per pattern) in an agent reply, or None if absent."""
+    fenced = _FENCED_JSON_RE.search(output)
+    if fenced:
+        output = fenced.group(1)
+    match = pattern.search(output)
+    return orjson.loads(match.group(0)) if match else None
+
+
+# Tool queries: fixed, parameterized text so the server reuses cached plans
+TECHNOLOGY_QUERY = """
+    MATCH (n:Entity)
+    WHERE n.type = 'technology' AND toLower(n.name) CONTAINS toLower($tech)
+    RETURN n.name as name, n.importance as importance
+    LIMIT 5
+"""
+
+CRITICAL_ASSETS_QUERY = """
+    MATCH (n:Entity)
+    WHERE n.importance > 0.7 OR n.type IN ['system', 'application', 'database']
+    RETURN n.name as name, n.type as type
+    ORDER BY n.importance DESC
+    LIMIT 10
+"""
+
+GEOGRAPHY_QUERY = """
+    MATCH (n:Entity)
+    WHERE n.type = 'geography' AND toLower(n.name) CONTAINS toLower($loc)
+    RETURN n.name as name
+    LIMIT 5
+"""
+
+RELATED_ENTITIES_QUERY = """
+    MATCH (n:Entity)
+    WHERE toLower(n.name) CONTAINS toLower($keyword)
+       OR toLower(n.description) CONTAINS toLower($keyword)
+    RETURN n.name as name, n.type as type
+    LIMIT 10
+"""
+
+BUSINESS_INITIATIVES_QUERY = """
+    MATCH (n:Entity)
+    WHERE n.type = 'business_initiative' OR n.type = 'project'
+    RETURN n.name as name
+    LIMIT 10
+"""
+
+
+# Mock-mode tool data (no Neo4j), with matchers built once at import
+MOCK_TECHNOLOGIES = MappingProxyType({
+    'kubernetes': 'Kubernetes (importance: 0.9), K8s-dashboard (importance: 0.7)',
+    'aws': 'AWS-EC2 (importance: 0.95), AWS-S3 (importance: 0.8), AWS-Lambda (importance: 0.7)',
+    'python': 'Python-3.9 (importance: 0.9), Django (importance: 0.8), Flask (importance: 0.6)',
+    'docker': 'Docker (importance: 0.85), Docker-Registry (importance: 0.7)',
+    'sql': 'MySQL (importance: 0.9), PostgreSQL (importance: 0.7)',
+    'apache': 'Apache-Struts (importance: 0.6), Apache-Kafka (importance: 0.8)',
+    'nodejs': 'Node.js-16 (importance: 0.7), Express.js (importance: 0.6)'
+})
+
+MOCK_ENTITIES = MappingProxyType({
+    'cloud': 'AWS-Migration-Project (project), Cloud-Infrastructure (system)',
+    'banking': 'Digital-Banking-Initiative (business_initiative), Core-Banking-System (system)',
+    'mobile': 'Mobile-Banking-App (application), Mobile-Payment-Service (system)',
+    'api': 'Payment-API (application), REST-API-Gateway (system)'
+})
+
+MOCK_LOCATIONS = frozenset(['singapore', 'jakarta', 'manila', 'southeast asia', 'asia pacific'])
+
+_MOCK_TECH_MATCHER = KeywordMatcher(MOCK_TECHNOLOGIES)
+_MOCK_ENTITY_MATCHER = KeywordMatcher(MOCK_ENTITIES)
+_MOCK_LOCATION_MATCHER = KeywordMatcher(MOCK_LOCATIONS)
+
+
+def _first_mock_match(mock: MappingProxyType, found: set) -> str | None:
+    """Value of the first key (in declaration order) among the matched keys."""
+    return next((value for key, value in mock.items() if key in found), None)
+
+
+def _cvss_score(threat: Dict[str, Any]) -> float:
+    try:
+        return float(threat.get('x_cvss_score') or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _read_rows_tx(tx, query: str, **params) -> List[Dict[str, Any]]:
+    # Consume inside the transaction: managed transactions may be retried on transient errors
+    return [record.data() for record in tx.run(query, **params)]
+
+
+def _match_entities_tx(tx, threats: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+    result = tx.run("""
+        UNWIND $threats AS t
+        MATCH (e:Entity)
+        WHERE size(e.name) > 2 AND t.text CONTAINS toLower(e.name)
+        RETURN t.id AS threat_id, collect(DISTINCT e.name) AS entities
+    """, threats=threats)
+    return [record.data() for record in result]
+
+
 class AutonomousCorrelationAgent:
     """
     Autonomous agent that uses tools to correlate threats with organizational context
@@ -35,237 +200,331 @@ class AutonomousCorrelationAgent:
             username = os.getenv("NEO4J_USERNAME")
             password = os.getenv("NEO4J_PASSWORD")
             
-            # Test connection using official guide pattern
-            with GraphDatabase.driver(uri, auth=(username, password)) as test_driver:
-                test_driver.verify_connectivity()
-                logger.info("Neo4j connectivity verified!")
-            
-            # Create persistent driver
-            self.driver = GraphDatabase.driver(uri, auth=(username, password))
+            # Persistent pooled driver, verified once and reused across requests. Each correlation
+            # worker holds one session, so the pool only needs to cover the workers plus headroom;
+            # a short acquisition timeout surfaces a saturated pool instead of stalling the agent
+            self.driver = GraphDatabase.driver(
+                uri,
+                auth=(username, password),
+                max_connection_pool_size=int(os.getenv("NEO4J_POOL", "20")),
+                connection_acquisition_timeout=5,
+                keep_alive=True
+            )
+            self.driver.verify_connectivity()
+            logger.info("Neo4j connectivity verified!")
         except Exception as e:
+            if getattr(self, "driver", None):
+                self.driver.close()
             logger.warning(f"Neo4j not available, using mock data: {e}")
             self.use_mock = True
             self.driver = None
         
+        # Fingerprint of the org-DNA graph the tool cache and entity matcher were built from
+        self._graph_key = None
+        self._entity_matcher = None
+
+        # Per-thread tool sessions, all closed in close()
+        self._sessions = threading.local()
+        self._open_sessions = []
+
+        # Tool results keyed by (tool, normalized input); cleared when the graph fingerprint changes
+        self._tool_cache: Dict[tuple, tuple] = {}
+        self._tool_cache_lock = Lock()
+        self._tool_cache_stats = {"hits": 0, "misses": 0}
+
         # LLM
-        self.llm = ChatOpenAI(temperature=0, model_name="gpt-4o")
+        # JSON mode: the final answer is always a parseable JSON object (tool calls are unaffected)
+        self.llm = ChatOpenAI(
+            temperature=0,
+            model_name="gpt-4o",
+            model_kwargs={"response_format": {"type": "json_object"}}
+        )
         
         # Create tools for the agent
         self.tools = self._create_tools()
         
         # Create the agent
         self.agent = self._create_agent()
+
+        # Concurrent agent runs per assessment window (each run is dominated by LLM/Neo4j latency)
+        self._executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("CAIBER_CORRELATION_WORKERS", "10")),
+            thread_name_prefix="correlation"
+        )
+
+        # The input-less tools are called by nearly every agent run; prime them once
+        for tool in self.tools:
+            if tool.name in ("get_critical_assets", "get_business_initiatives"):
+                try:
+                    tool.func("")
+                except Exception as e:
+                    logger.warning(f"Could not warm {tool.name}: {e}")
     
     def _create_tools(self) -> List[Tool]:
         """Create tools the agent can use"""
         
         tools = [
             Tool(
-                name="search_technologies",
-                description="Search for specific technologies in our organization's knowledge graph. Input: technology name (e.g., 'AWS', 'Python')",
-                func=self._search_technologies
-            ),
-            Tool(
-                name="get_critical_assets",
-                description="Get list of critical assets and systems in our organization",
-                func=self._get_critical_assets
-            ),
-            Tool(
-                name="check_geographic_presence",
-                description="Check if we have presence in a specific geographic location. Input: location name",
-                func=self._check_geographic_presence
-            ),
-            Tool(
-                name="find_related_entities",
-                description="Find entities related to a specific keyword. Input: keyword",
-                func=self._find_related_entities
-            ),
-            Tool(
-                name="get_business_initiatives",
-                description="Get our current business initiatives and projects",
-                func=self._get_business_initiatives
+                name=name,
+                description=description,
+                func=self._cached_tool(name, getattr(self, f"_{name}"))
             )
+            for name, description in TOOL_DESCRIPTIONS.items()
         ]
         
         return tools
     
+    def _cached_tool(self, name: str, func: Callable[[str], str]) -> Callable[[str], str]:
+        """Wrap a tool so repeated lookups of the same input within TOOL_CACHE_TTL skip Neo4j."""
+        def cached(tool_input: str = "") -> str:
+            key = (name, (tool_input or "").strip().lower())
+            now = time.monotonic()
+            with self._tool_cache_lock:
+                entry = self._tool_cache.get(key)
+                if entry is not None and entry[0] > now:
+                    self._tool_cache_stats["hits"] += 1
+                    return entry[1]
+                self._tool_cache_stats["misses"] += 1
+            result = func(tool_input)
+            with self._tool_cache_lock:
+                if len(self._tool_cache) >= TOOL_CACHE_SIZE:
+                    self._tool_cache.clear()
+                self._tool_cache[key] = (now + TOOL_CACHE_TTL, result)
+            return result
+        return cached
+
+    def _read_session(self):
+        """Long-lived READ session for the calling thread, reused by every tool call it makes
+        (sessions are not thread-safe, so each correlation worker gets its own)."""
+        session = getattr(self._sessions, "session", None)
+        if session is None:
+            session = self._sessions.session = self.driver.session(
+                default_access_mode=READ_ACCESS, fetch_size=100
+            )
+            with self._tool_cache_lock:
+                self._open_sessions.append(session)
+        return session
+
+    def _read(self, query: str, **params) -> List[Dict[str, Any]]:
+        """Run a read-only tool query as a managed READ transaction (routable to replicas, retried)."""
+        return self._read_session().execute_read(_read_rows_tx, query, **params)
+
+    def tool_cache_info(self) -> Dict[str, int]:
+        with self._tool_cache_lock:
+            return dict(self._tool_cache_stats, size=len(self._tool_cache))
+
+    def refresh_graph_state(self) -> None:
+        """Rebuild the entity-name matcher and drop cached tool answers if the org-DNA graph changed."""
+        if self.use_mock:
+            return
+        key = graph_fingerprint(self.driver)
+        if key is None:
+            self._entity_matcher = None
+        elif key != self._graph_key:
+            with self.driver.session() as session:
+                rows = session.run("MATCH (n:Entity) WHERE size(n.name) > 2 RETURN n.name AS name").data()
+            names = {row['name'].lower() for row in rows}
+            self._entity_matcher = KeywordMatcher(names)
+            logger.info(f"Entity matcher built from {len(names)} entity names")
+            # Cached tool answers describe the previous graph
+            with self._tool_cache_lock:
+                self._tool_cache.clear()
+        self._graph_key = key
+
+    def _mentions_org_entity(self, text: str) -> bool:
+        """Whether threat text contains the full name of an org entity (no matcher: assume it does)."""
+        if self._entity_matcher is None:
+            return True
+        return self._entity_matcher.matches(text)
+
     def _search_technologies(self, technology: str) -> str:
         """Search for a technology in our stack"""
         if self.use_mock:
-            # Mock data for common technologies
-            mock_tech = {
-                'kubernetes': 'Kubernetes (importance: 0.9), K8s-dashboard (importance: 0.7)',
-                'aws': 'AWS-EC2 (importance: 0.95), AWS-S3 (importance: 0.8), AWS-Lambda (importance: 0.7)',
-                'python': 'Python-3.9 (importance: 0.9), Django (importance: 0.8), Flask (importance: 0.6)',
-                'docker': 'Docker (importance: 0.85), Docker-Registry (importance: 0.7)',
-                'sql': 'MySQL (importance: 0.9), PostgreSQL (importance: 0.7)',
-                'apache': 'Apache-Struts (importance: 0.6), Apache-Kafka (importance: 0.8)',
-                'nodejs': 'Node.js-16 (importance: 0.7), Express.js (importance: 0.6)'
-            }
-            
+            # Keys inside the query, plus keys the query is a fragment of (e.g. "kube")
             tech_lower = technology.lower()
-            for key, value in mock_tech.items():
-                if key in tech_lower or tech_lower in key:
-                    return f"Found technologies: {value}"
+            found = _MOCK_TECH_MATCHER.find(tech_lower)
+            found.update(key for key in MOCK_TECHNOLOGIES if tech_lower in key)
+            value = _first_mock_match(MOCK_TECHNOLOGIES, found)
+            if value:
+                return f"Found technologies: {value}"
             return f"No '{technology}' found in our tech stack"
         
-        with self.driver.session() as session:
-            result = session.run("""
-                MATCH (n:Entity)
-                WHERE n.type = 'technology' AND toLower(n.name) CONTAINS toLower($tech)
-                RETURN n.name as name, n.importance as importance
-                LIMIT 5
-            """, tech=technology)
-            
-            techs = [f"{r['name']} (importance: {r['importance']})" for r in result]
-            
-            if techs:
-                return f"Found technologies: {', '.join(techs)}"
-            return f"No '{technology}' found in our tech stack"
+        result = self._read(TECHNOLOGY_QUERY, tech=technology)
+        techs = [f"{r['name']} (importance: {r['importance']})" for r in result]
+        
+        if techs:
+            return f"Found technologies: {', '.join(techs)}"
+        return f"No '{technology}' found in our tech stack"
     
     def _get_critical_assets(self, _: str = "") -> str:
         """Get critical organizational assets"""
         if self.use_mock:
             return "Critical assets: Customer-Database (database), Payment-API (application), Auth-Service (system), Mobile-Banking-App (application), Trading-Platform (system)"
         
-        with self.driver.session() as session:
-            result = session.run("""
-                MATCH (n:Entity)
-                WHERE n.importance > 0.7 OR n.type IN ['system', 'application', 'database']
-                RETURN n.name as name, n.type as type
-                ORDER BY n.importance DESC
-                LIMIT 10
-            """)
-            
-            assets = [f"{r['name']} ({r['type']})" for r in result]
-            return f"Critical assets: {', '.join(assets)}" if assets else "No critical assets identified"
+        result = self._read(CRITICAL_ASSETS_QUERY)
+        assets = [f"{r['name']} ({r['type']})" for r in result]
+        return f"Critical assets: {', '.join(assets)}" if assets else "No critical assets identified"
     
     def _check_geographic_presence(self, location: str) -> str:
         """Check geographic presence"""
         if self.use_mock:
-            mock_locations = ['singapore', 'jakarta', 'manila', 'southeast asia', 'asia pacific']
-            if any(loc in location.lower() for loc in mock_locations):
+            if _MOCK_LOCATION_MATCHER.matches(location):
                 return f"We have presence in: Singapore, Jakarta, Manila"
             return f"No presence found in '{location}'"
         
-        with self.driver.session() as session:
-            result = session.run("""
-                MATCH (n:Entity)
-                WHERE n.type = 'geography' AND toLower(n.name) CONTAINS toLower($loc)
-                RETURN n.name as name
-                LIMIT 5
-            """, loc=location)
-            
-            locations = [r['name'] for r in result]
-            
-            if locations:
-                return f"We have presence in: {', '.join(locations)}"
-            return f"No presence found in '{location}'"
+        result = self._read(GEOGRAPHY_QUERY, loc=location)
+        locations = [r['name'] for r in result]
+        
+        if locations:
+            return f"We have presence in: {', '.join(locations)}"
+        return f"No presence found in '{location}'"
     
     def _find_related_entities(self, keyword: str) -> str:
         """Find any entities related to a keyword"""
         if self.use_mock:
-            mock_entities = {
-                'cloud': 'AWS-Migration-Project (project), Cloud-Infrastructure (system)',
-                'banking': 'Digital-Banking-Initiative (business_initiative), Core-Banking-System (system)',
-                'mobile': 'Mobile-Banking-App (application), Mobile-Payment-Service (system)',
-                'api': 'Payment-API (application), REST-API-Gateway (system)'
-            }
-            keyword_lower = keyword.lower()
-            for key, value in mock_entities.items():
-                if key in keyword_lower:
-                    return f"Related entities: {value}"
+            value = _first_mock_match(MOCK_ENTITIES, _MOCK_ENTITY_MATCHER.find(keyword))
+            if value:
+                return f"Related entities: {value}"
             return f"No entities found related to '{keyword}'"
         
-        with self.driver.session() as session:
-            result = session.run("""
-                MATCH (n:Entity)
-                WHERE toLower(n.name) CONTAINS toLower($keyword)
-                   OR toLower(n.description) CONTAINS toLower($keyword)
-                RETURN n.name as name, n.type as type
-                LIMIT 10
-            """, keyword=keyword)
-            
-            entities = [f"{r['name']} ({r['type']})" for r in result]
-            
-            if entities:
-                return f"Related entities: {', '.join(entities)}"
-            return f"No entities found related to '{keyword}'"
+        result = self._read(RELATED_ENTITIES_QUERY, keyword=keyword)
+        entities = [f"{r['name']} ({r['type']})" for r in result]
+        
+        if entities:
+            return f"Related entities: {', '.join(entities)}"
+        return f"No entities found related to '{keyword}'"
     
     def _get_business_initiatives(self, _: str = "") -> str:
         """Get business initiatives"""
         if self.use_mock:
             return "Business initiatives: Southeast-Asia-Expansion, Digital-Banking-Transformation, Cloud-Migration-2024, Mobile-First-Strategy"
         
-        with self.driver.session() as session:
-            result = session.run("""
-                MATCH (n:Entity)
-                WHERE n.type = 'business_initiative' OR n.type = 'project'
-                RETURN n.name as name
-                LIMIT 10
-            """)
-            
-            initiatives = [r['name'] for r in result]
-            return f"Business initiatives: {', '.join(initiatives)}" if initiatives else "No initiatives found"
+        result = self._read(BUSINESS_INITIATIVES_QUERY)
+        initiatives = [r['name'] for r in result]
+        return f"Business initiatives: {', '.join(initiatives)}" if initiatives else "No initiatives found"
     
     def _create_agent(self) -> AgentExecutor:
         """Create the autonomous agent"""
         
-        # Create prompt
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a cybersecurity risk assessment expert. Your job is to analyze threats 
-            against our organization's context and determine risk levels.
-            
-            Use the available tools to investigate:
-            1. Whether the threat affects our technologies
-            2. If it targets our geographic regions
-            3. Which critical assets could be impacted
-            4. How it relates to our business initiatives
-            
-            For each threat, provide a risk assessment with:
-            - Risk Score (1-10)
-            - Affected Assets
-            - Business Impact
-            - Reasoning
-            
-            Be thorough but efficient. Use tools to gather context, then make your assessment."""),
-            ("user", "{input}"),
-            MessagesPlaceholder(variable_name="agent_scratchpad")
-        ])
-        
         # Create agent
-        agent = create_openai_tools_agent(self.llm, self.tools, prompt)
+        agent = create_openai_tools_agent(self.llm, self.tools, AGENT_PROMPT)
         
         # Create executor
         agent_executor = AgentExecutor(
             agent=agent,
             tools=self.tools,
-            verbose=True,  # Set to False in production
-            max_iterations=5,
+            # Tool-call tracing to stdout is opt-in; it serializes the concurrent workers on stdout
+            verbose=os.getenv("CAIBER_AGENT_VERBOSE", "0") == "1",
+            max_iterations=int(os.getenv("CAIBER_AGENT_MAX_ITERATIONS", "3")),
+            # Tools-agents only support "force"; the parser fallback in assess_threat handles the stop text
+            early_stopping_method="force",
+            return_intermediate_steps=False,
             handle_parsing_errors=True
         )
         
         return agent_executor
     
-    def assess_threat(self, threat: Dict[str, Any]) -> Dict[str, Any]:
+    def _threat_text(self, threat: Dict[str, Any]) -> str:
+        return f"{threat.get('name', '')} {threat.get('description', '')}".lower()
+
+    def match_org_entities(self, threats: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+        """
+        Find organizational entities mentioned by each threat in a single UNWIND query
+        instead of one round-trip per threat. Returns {threat_text: [entity names]}.
+        """
+        if self.use_mock or not threats:
+            return {}
+
+        # Deduplicate threat text before batching
+        unique_texts = list(dict.fromkeys(self._threat_text(t) for t in threats))
+        batch = [{"id": str(i), "text": text} for i, text in enumerate(unique_texts)]
+
+        try:
+            with self.driver.session() as session:
+                rows = session.execute_read(_match_entities_tx, batch)
+        except Exception as e:
+            logger.warning(f"Batched entity match failed, agent will rely on tools: {e}")
+            return {}
+
+        return {unique_texts[int(row['threat_id'])]: row['entities'] for row in rows}
+
+    def _describe_threat(self, threat: Dict[str, Any], org_matches: List[str] = None) -> str:
+        """Threat fields as shown to the agent."""
+        description = threat.get('description', '')
+        lines = [f"Name: {threat.get('name', 'Unknown')}", f"Description: {description[:300]}"]
+        if threat.get('type') == 'vulnerability':
+            lines.append(f"Severity: {threat.get('x_severity', 'UNKNOWN')}")
+            lines.append(f"CVSS Score: {threat.get('x_cvss_score', 'N/A')}")
+        if org_matches:
+            lines.append(f"Organizational entities mentioned by this threat: {', '.join(org_matches)}")
+        return "\n            ".join(lines)
+
+    def _normalize_assessment(self, raw_assessment: Dict[str, Any], threat: Dict[str, Any]) -> Dict[str, Any]:
+        """Map the agent's JSON onto the fields the frontend expects and derive risk_level."""
+        # 🔑 Normalize keys so frontend always gets consistent fields
+        assessment = {
+            "risk_score": raw_assessment.get("Risk Score", raw_assessment.get("risk_score", 0)),
+            "affected_assets": raw_assessment.get("Affected Assets", raw_assessment.get("affected_assets", [])),
+            "business_impact": raw_assessment.get("Business Impact", raw_assessment.get("business_impact", "")),
+            "correlation_reasoning": raw_assessment.get("Reasoning", raw_assessment.get("correlation_reasoning", "")),
+            "mitigation_recommendation": raw_assessment.get(
+                "Mitigation",
+                raw_assessment.get("mitigation_recommendation", "Implement security controls and monitoring")
+            ),
+            "threat_id": threat.get('name', 'Unknown'),
+            "threat_type": threat.get('type', 'unknown'),
+            "description": threat.get('description', '')
+        }
+
+        # 🎚️ Derive risk_level from risk_score
+        score = assessment["risk_score"] or 0
+        if score >= 8:
+            assessment["risk_level"] = "CRITICAL"
+        elif score >= 6:
+            assessment["risk_level"] = "HIGH"
+        elif score >= 3:
+            assessment["risk_level"] = "MEDIUM"
+        else:
+            assessment["risk_level"] = "LOW"
+
+        return assessment
+
+    def _failed_assessment(self, threat: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+        return {
+            "threat_id": threat.get('name', 'Unknown'),
+            "threat_type": threat.get('type', 'unknown'),
+            "risk_score": 0,
+            "risk_level": "LOW",
+            "affected_assets": [],
+            "business_impact": "Unknown",
+            "correlation_reasoning": f"Error: {str(error)}",
+            "mitigation_recommendation": "Investigate manually"
+        }
+
+    def _triage_assessment(self, threat: Dict[str, Any], text: str) -> Dict[str, Any] | None:
+        """Deterministic assessment for low-severity vulnerabilities with no org context, else None."""
+        if threat.get('type') != 'vulnerability' or self.use_mock:
+            return None
+        cvss = _cvss_score(threat)
+        if cvss >= TRIAGE_CVSS_THRESHOLD or self._mentions_org_entity(text):
+            return None
+        return self._normalize_assessment({
+            "risk_score": max(1, cvss / 2),
+            "business_impact": "No organizational exposure identified",
+            "correlation_reasoning": "No org-context match; scored from CVSS without agent analysis",
+        }, threat)
+
+    def assess_threat(self, threat: Dict[str, Any], org_matches: List[str] = None) -> Dict[str, Any]:
         """
         Autonomously assess a single threat using tools
         """
-        threat_type = threat.get('type', 'unknown')
         threat_name = threat.get('name', 'Unknown')
-        description = threat.get('description', '')
 
         # Build input for agent
-        if threat_type == 'vulnerability':
-            severity = threat.get('x_severity', 'UNKNOWN')
-            cvss = threat.get('x_cvss_score', 'N/A')
-
+        if threat.get('type') == 'vulnerability':
             agent_input = f"""
             Analyze this vulnerability:
-            Name: {threat_name}
-            Description: {description[:300]}
-            Severity: {severity}
-            CVSS Score: {cvss}
+            {self._describe_threat(threat, org_matches)}
 
             Use tools to determine if this affects our organization.
             Provide a JSON risk assessment.
@@ -273,8 +532,7 @@ class AutonomousCorrelationAgent:
         else:
             agent_input = f"""
             Analyze this threat indicator:
-            Name: {threat_name}
-            Description: {description[:300]}
+            {self._describe_threat(threat, org_matches)}
 
             Use tools to determine if this threat is relevant to us.
             Provide a JSON risk assessment.
@@ -288,12 +546,8 @@ class AutonomousCorrelationAgent:
             output = result.get('output', '')
 
             # Try to extract JSON from the output
-            if '{' in output and '}' in output:
-                json_start = output.index('{')
-                json_end = output.rindex('}') + 1
-                json_str = output[json_start:json_end]
-                raw_assessment = json.loads(json_str)
-            else:
+            raw_assessment = _extract_json(output, _JSON_OBJECT_RE)
+            if raw_assessment is None:
                 # Fallback if no JSON found
                 raw_assessment = {
                     "risk_score": 5,
@@ -302,80 +556,202 @@ class AutonomousCorrelationAgent:
                     "reasoning": output[:200]
                 }
 
-            # 🔑 Normalize keys so frontend always gets consistent fields
-            assessment = {
-                "risk_score": raw_assessment.get("Risk Score", raw_assessment.get("risk_score", 0)),
-                "affected_assets": raw_assessment.get("Affected Assets", raw_assessment.get("affected_assets", [])),
-                "business_impact": raw_assessment.get("Business Impact", raw_assessment.get("business_impact", "")),
-                "correlation_reasoning": raw_assessment.get("Reasoning", raw_assessment.get("correlation_reasoning", "")),
-                "mitigation_recommendation": raw_assessment.get(
-                    "Mitigation",
-                    raw_assessment.get("mitigation_recommendation", "Implement security controls and monitoring")
-                ),
-                "threat_id": threat_name,
-                "threat_type": threat_type,
-                "description": description
-            }
-
-            # 🎚️ Derive risk_level from risk_score
-            score = assessment["risk_score"] or 0
-            if score >= 8:
-                assessment["risk_level"] = "CRITICAL"
-            elif score >= 6:
-                assessment["risk_level"] = "HIGH"
-            elif score >= 3:
-                assessment["risk_level"] = "MEDIUM"
-            else:
-                assessment["risk_level"] = "LOW"
-
-            return assessment
+            return self._normalize_assessment(raw_assessment, threat)
 
         except Exception as e:
             logger.error(f"Agent failed for {threat_name}: {e}")
-            return {
-                "threat_id": threat_name,
-                "threat_type": threat_type,
-                "risk_score": 0,
-                "risk_level": "LOW",
-                "affected_assets": [],
-                "business_impact": "Unknown",
-                "correlation_reasoning": f"Error: {str(e)}",
-                "mitigation_recommendation": "Investigate manually"
-            }
+            return self._failed_assessment(threat, e)
+
+    def assess_threats_batch(
+        self,
+        threats: List[Dict[str, Any]],
+        org_matches: List[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Assess several threats in one agent run (one system prompt and tool-planning pass for the
+        group). Falls back to per-threat assess_threat when the reply is not a JSON array with
+        exactly one assessment per threat.
+        """
+        org_matches = org_matches or [None] * len(threats)
+        if len(threats) == 1:
+            return [self.assess_threat(threats[0], org_matches[0])]
+
+        numbered = "\n\n            ".join(
+            f"[{index}] {'Vulnerability' if threat.get('type') == 'vulnerability' else 'Threat indicator'}\n"
+            f"            {self._describe_threat(threat, matches)}"
+            for index, (threat, matches) in enumerate(zip(threats, org_matches))
+        )
+        agent_input = f"""
+            Analyze each of these {len(threats)} threats:
+
+            {numbered}
+
+            Use tools to determine whether each one affects our organization.
+            Return a JSON object {{"assessments": [...]}} with one risk assessment object per input
+            threat, in the same order, each including an "index" field with the threat's number.
+            """
+
+        # One run plans tool calls for every threat, so give it each threat's iteration budget
+        agent = self.agent.model_copy(update={"max_iterations": self.agent.max_iterations * len(threats)})
+        try:
+            output = agent.invoke({"input": agent_input}).get('output', '')
+            reply = _extract_json(output, _JSON_OBJECT_RE)
+            raw_assessments = (
+                reply.get("assessments") if isinstance(reply, dict)
+                else _extract_json(output, _JSON_ARRAY_RE)
+            )
+            if not isinstance(raw_assessments, list):
+                raise ValueError(f"expected a list of assessments, got {type(raw_assessments).__name__}")
+            if len(raw_assessments) != len(threats):
+                raise ValueError(f"expected {len(threats)} assessments, got {len(raw_assessments)}")
+            if all(isinstance(raw, dict) and isinstance(raw.get("index"), int) for raw in raw_assessments):
+                raw_assessments = sorted(raw_assessments, key=lambda raw: raw["index"])
+            return [
+                self._normalize_assessment(raw, threat)
+                for raw, threat in zip(raw_assessments, threats)
+            ]
+        except Exception as e:
+            logger.warning(f"Batched assessment of {len(threats)} threats failed, assessing individually: {e}")
+            return [self.assess_threat(threat, matches) for threat, matches in zip(threats, org_matches)]
 
     
+    def _refresh_graph_state_safely(self) -> None:
+        try:
+            self.refresh_graph_state()
+        except Exception as e:
+            logger.warning(f"Entity matcher unavailable, every vulnerability goes to the agent: {e}")
+            self._entity_matcher = None
+
+    def _assess_window(self, threats: List[Dict[str, Any]], assessed: Dict[tuple, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Assess a batch of threats, returning those with a non-zero risk score."""
+        return list(self._iter_window(threats, assessed))
+
+    def _iter_window(self, threats: List[Dict[str, Any]], assessed: Dict[tuple, Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Yield the non-zero-risk assessments of a batch of threats as each agent run finishes."""
+        # One Neo4j round-trip for every threat's org-entity matches
+        org_matches = self.match_org_entities(threats)
+
+        # Identical threat text yields an identical agent input, so assess it once and fan the result out
+        keys = []
+        pending = {}
+        for threat in threats:
+            text = self._threat_text(threat)
+            key = (threat.get('type') == 'vulnerability', text)
+            keys.append(key)
+            if key in assessed or key in pending:
+                logger.debug(f"Reusing assessment for duplicate threat: {threat.get('name')}")
+            elif (triaged := self._triage_assessment(threat, text)) is not None:
+                logger.debug(f"Triaged without agent: {threat.get('name')}")
+                assessed[key] = triaged
+            else:
+                logger.info(f"Assessing {'vulnerability' if key[0] else 'indicator'}: {threat.get('name')}")
+                pending[key] = threat
+
+        # Up to ASSESSMENT_BATCH_SIZE threats share one agent run; batches are independent,
+        # network-bound runs, so they execute side by side
+        pending_keys = list(pending)
+        batches = [
+            pending_keys[start:start + ASSESSMENT_BATCH_SIZE]
+            for start in range(0, len(pending_keys), ASSESSMENT_BATCH_SIZE)
+        ]
+        futures = {
+            self._executor.submit(
+                self.assess_threats_batch,
+                [pending[key] for key in batch],
+                [org_matches.get(key[1]) for key in batch]
+            ): batch
+            for batch in batches
+        }
+
+        # Already-known assessments first, then each batch as soon as its agent run completes
+        occurrences = Counter(keys)
+
+        def emit(done_keys):
+            for key in done_keys:
+                assessment = assessed[key]
+                if assessment.get('risk_score', 0) > 0:
+                    for _ in range(occurrences[key]):
+                        yield dict(assessment)
+
+        yield from emit(key for key in occurrences if key not in pending)
+        for future in as_completed(futures):
+            batch = futures[future]
+            assessed.update(zip(batch, future.result()))
+            yield from emit(batch)
+
+    def _select_threats(self, threat_landscape: Dict[str, Any]) -> List[Dict[str, Any]]:
+        # Limit for demo: the highest-CVSS vulnerabilities rather than the first few
+        vulnerabilities = heapq.nlargest(5, threat_landscape.get('vulnerabilities', []), key=_cvss_score)
+        indicators = threat_landscape.get('indicators', [])[:5]  # Limit for demo
+        return vulnerabilities + indicators
+
+    async def correlate_threats_stream(self, threat_landscape: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of correlate_threats: yields each assessment as its agent run
+        completes (unsorted) instead of returning the full list at the end.
+        """
+        logger.info("Starting streaming autonomous threat correlation")
+        await asyncio.to_thread(self._refresh_graph_state_safely)
+
+        assessments = self._iter_window(self._select_threats(threat_landscape), {})
+        # Each step blocks on agent runs, so advance the generator off the event loop
+        while (assessment := await asyncio.to_thread(next, assessments, None)) is not None:
+            yield assessment
+
     def correlate_threats(self, threat_landscape: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
         Process multiple threats autonomously
         """
         logger.info("Starting autonomous threat correlation")
-        
-        risk_assessments = []
-        
-        # Process top vulnerabilities
-        vulnerabilities = threat_landscape.get('vulnerabilities', [])[:5]  # Limit for demo
-        for vuln in vulnerabilities:
-            logger.info(f"Assessing vulnerability: {vuln.get('name')}")
-            assessment = self.assess_threat(vuln)
-            if assessment.get('risk_score', 0) > 0:
-                risk_assessments.append(assessment)
-        
-        # Process top indicators
-        indicators = threat_landscape.get('indicators', [])[:5]  # Limit for demo
-        for indicator in indicators:
-            logger.info(f"Assessing indicator: {indicator.get('name')}")
-            assessment = self.assess_threat(indicator)
-            if assessment.get('risk_score', 0) > 0:
-                risk_assessments.append(assessment)
+
+        self._refresh_graph_state_safely()
+        risk_assessments = self._assess_window(self._select_threats(threat_landscape), {})
         
         # Sort by risk score
         risk_assessments.sort(key=lambda x: x.get('risk_score', 0), reverse=True)
 
         logger.info(f"Completed autonomous assessment: {len(risk_assessments)} risks identified")
         return risk_assessments
+
+    async def correlate_stream(
+        self,
+        threat_iter: AsyncIterator[Dict[str, Any]],
+        window_size: int = 128,
+        max_per_type: int = 5
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Consume threats as they arrive and yield assessments window by window,
+        so neither the full landscape nor the full assessment list is held in memory.
+        max_per_type mirrors the demo limit in correlate_threats (None for no limit).
+        """
+        logger.info("Starting streaming threat correlation")
+        await asyncio.to_thread(self._refresh_graph_state_safely)
+
+        taken = {True: 0, False: 0}
+        assessed: Dict[tuple, Dict[str, Any]] = {}
+        window: List[Dict[str, Any]] = []
+
+        async for threat in threat_iter:
+            is_vuln = threat.get('type') == 'vulnerability'
+            if max_per_type is not None and taken[is_vuln] >= max_per_type:
+                continue
+            taken[is_vuln] += 1
+            window.append(threat)
+            if len(window) >= window_size:
+                for assessment in await asyncio.to_thread(self._assess_window, window, assessed):
+                    yield assessment
+                window = []
+
+        if window:
+            for assessment in await asyncio.to_thread(self._assess_window, window, assessed):
+                yield assessment
     
     def close(self):
         """Clean up resources"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for session in self._open_sessions:
+            session.close()
+        self._open_sessions.clear()
         if self.driver and not self.use_mock:
             self.driver.close()
 
@@ -1,23 +1,323 @@
+import asyncio
+import ipaddress
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import orjson
 import requests
-from stix2 import Indicator, Vulnerability
-import json
-from langchain_openai import ChatOpenAI
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 load_dotenv()
-from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, AsyncIterator, Iterable, Literal, Optional, Union
+from .keyword_matcher import KeywordMatcher, get_matcher
+from .feed_cache import FEED_TTLS, feed_cache
+from .landscape_store import write_landscape_parquet
+from . import provider_health
 
-llm = ChatOpenAI(temperature=0, model_name="gpt-4o")
+DEFAULT_KEYWORDS = frozenset({"threat", "vulnerability", "malware"})
 
 
-def flatten_keywords(keywords: Dict[str, List[str]]) -> set:
-    """Flatten dict of keyword categories into a lowercase set of terms"""
+def keywords_key(keywords: Dict[str, List[str]]) -> frozenset:
+    """Hashable, order-insensitive form of a PIR keyword dict, used as an lru_cache key."""
+    return frozenset((category, tuple(sorted(values))) for category, values in keywords.items())
+
+
+@lru_cache(maxsize=256)
+def _flatten_keywords_key(key: frozenset) -> frozenset:
+    return frozenset(kw.lower() for _, values in key for kw in values)
+
+
+def flatten_keywords(keywords: Union[Dict[str, List[str]], Iterable[str]]) -> set:
+    """Flatten dict of keyword categories (or a plain keyword collection) into a lowercase set of terms"""
     if not keywords:
-        return {"threat", "vulnerability", "malware"}
-    return {kw.lower() for values in keywords.values() for kw in values}
+        return set(DEFAULT_KEYWORDS)
+    if isinstance(keywords, dict):
+        # Every agent flattens the same PIR dict on each request; memoize on its contents
+        return set(_flatten_keywords_key(keywords_key(keywords)))
+    return {kw.lower() for kw in keywords}
+
+
+# Compile the fallback keyword automaton once at import
+get_matcher(DEFAULT_KEYWORDS)
+
+
+# IOC sniffing: cheap length/first-character checks gate each precompiled regex
+_HEX_RE = re.compile(r"[0-9a-fA-F]+")
+_CVE_RE = re.compile(r"CVE-\d{4}-\d{4,}", re.IGNORECASE)
+_IPV4_RE = re.compile(r"(?:25[0-5]|2[0-4]\d|1?\d?\d)(?:\.(?:25[0-5]|2[0-4]\d|1?\d?\d)){3}")
+# Hextet shape (3-8 groups of up to four hex digits, optional dotted-quad tail); ipaddress has the final say
+_IPV6_RE = re.compile(r"[0-9a-fA-F]{0,4}(?::[0-9a-fA-F]{0,4}){2,7}(?:(?<=:)(?:\d{1,3}\.){3}\d{1,3})?")
+_URL_RE = re.compile(r"[a-zA-Z][a-zA-Z0-9+.-]*://\S+")
+_DOMAIN_RE = re.compile(r"(?:[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?\.)+[a-zA-Z]{2,63}")
+_HASH_LENGTHS = {32: "md5", 40: "sha1", 64: "sha256"}
+
+IocType = Literal["ipv4", "ipv6", "domain", "sha256", "sha1", "md5", "cve", "url"]
+
+# OTX indicator type -> STIX object path
+_STIX_TYPE_MAP = {
+    "IPv4": "ipv4-addr:value",
+    "IPv6": "ipv6-addr:value",
+    "domain": "domain-name:value",
+    "hostname": "domain-name:value",
+    "URL": "url:value",
+    "FileHash-SHA256": "file:hashes.'SHA-256'",
+    "FileHash-SHA1": "file:hashes.'SHA-1'",
+    "FileHash-MD5": "file:hashes.'MD5'",
+    "Email": "email-addr:value",
+}
+
+_SNIFFED_STIX_PATHS = {
+    "ipv4": "ipv4-addr:value",
+    "ipv6": "ipv6-addr:value",
+    "domain": "domain-name:value",
+    "url": "url:value",
+    "sha256": "file:hashes.'SHA-256'",
+    "sha1": "file:hashes.'SHA-1'",
+    "md5": "file:hashes.'MD5'",
+}
+
+
+def _is_ipv6(value: str) -> bool:
+    if not _IPV6_RE.fullmatch(value):
+        return False
+    try:
+        ipaddress.IPv6Address(value)
+    except ValueError:
+        return False
+    return True
+
+
+def sniff_ioc_type(value: str) -> Optional[IocType]:
+    """Classify a raw indicator string without attempting every type-specific parse."""
+    if not value or len(value) > 2048:
+        return None
+    value = value.strip()
+    if not value:
+        return None
+    length = len(value)
+    first = value[0]
+
+    if length in _HASH_LENGTHS and _HEX_RE.fullmatch(value):
+        return _HASH_LENGTHS[length]
+    if first in "Cc" and _CVE_RE.fullmatch(value):
+        return "cve"
+    if first.isdigit() and length <= 15 and _IPV4_RE.fullmatch(value):
+        return "ipv4"
+    if "://" in value:
+        return "url" if _URL_RE.fullmatch(value) else None
+    if ":" in value:
+        return "ipv6" if _is_ipv6(value) else None
+    if "." in value and _DOMAIN_RE.fullmatch(value):
+        return "domain"
+    return None
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def threat_key(item: Dict[str, Any]) -> tuple:
+    """Content identity of a threat: CVE/GHSA id for vulnerabilities, (type, value) for indicators."""
+    # Runs once per collected item, so each field is looked up once
+    if (item_type := item.get("type", "")) == "vulnerability":
+        return ("vulnerability", (item.get("name") or item.get("id", "")).upper())
+    return (item_type, (item.get("indicator") or item.get("pattern", "")).lower())
+
+
+def normalize_landscape(threat_landscape: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Collapse duplicate threats in place before correlation.
+    STIX ids are random per object, so duplicates are keyed on content instead:
+    indicators on (type, value) with every reporting pulse kept in x_pulses,
+    vulnerabilities on their CVE/GHSA id with missing CVSS data and references merged.
+    """
+    unique_iocs: Dict[tuple, Dict] = {}
+    for item in threat_landscape.get("indicators", []):
+        add_unique_indicator(unique_iocs, item)
+
+    unique_vulns: Dict[tuple, Dict] = {}
+    for item in threat_landscape.get("vulnerabilities", []):
+        add_unique_vulnerability(unique_vulns, item)
+
+    return set_landscape_items(threat_landscape, unique_iocs, unique_vulns)
+
+
+def add_unique_indicator(unique_iocs: Dict[tuple, Dict], item: Dict[str, Any]) -> None:
+    """Insert an indicator keyed on content, or record its pulse on the copy already kept."""
+    key = threat_key(item)
+    pulse = _intern(item.get("pulse", ""))
+    first = unique_iocs.get(key)
+    if first is None:
+        item["type"] = _intern(item.get("type", "unknown"))
+        item["pulse"] = pulse
+        item["x_pulses"] = [pulse] if pulse else []
+        unique_iocs[key] = item
+    elif pulse and pulse not in first["x_pulses"]:
+        first["x_pulses"].append(pulse)
+
+
+def add_unique_vulnerability(unique_vulns: Dict[tuple, Dict], item: Dict[str, Any]) -> None:
+    """Insert a vulnerability keyed on its id, or merge CVSS data and references into the kept copy."""
+    key = threat_key(item)
+    first = unique_vulns.get(key)
+    if first is None:
+        item["name"] = _intern(item.get("name", ""))
+        unique_vulns[key] = item
+        return
+    if first.get("x_cvss_score") is None and item.get("x_cvss_score") is not None:
+        first["x_cvss_score"] = item["x_cvss_score"]
+        first["x_severity"] = item.get("x_severity", first.get("x_severity"))
+    refs = first.setdefault("external_references", [])
+    for ref in item.get("external_references", []):
+        if ref not in refs:
+            refs.append(ref)
+
+
+def set_landscape_items(threat_landscape: Dict[str, Any], unique_iocs: Dict[tuple, Dict],
+                        unique_vulns: Dict[tuple, Dict]) -> Dict[str, Any]:
+    threat_landscape["indicators"] = list(unique_iocs.values())
+    threat_landscape["vulnerabilities"] = list(unique_vulns.values())
+    threat_landscape["total_items"] = len(unique_iocs) + len(unique_vulns)
+    return threat_landscape
+
+
+def stix_timestamp() -> str:
+    """Current UTC time in the STIX 2.1 timestamp format stix2 emits."""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def stix_indicator_dict(name: Optional[str], pattern: str, description: str, timestamp: str) -> Dict[str, Any]:
+    """
+    The dict stix2.Indicator(...).serialize() would produce for a STIX-pattern indicator,
+    built directly: no per-indicator object validation or serialize/parse round-trip.
+    """
+    indicator = {
+        "type": "indicator",
+        "spec_version": "2.1",
+        "id": f"indicator--{uuid.uuid4()}",
+        "created": timestamp,
+        "modified": timestamp,
+    }
+    if name is not None:
+        indicator["name"] = name
+    indicator.update({
+        "description": description,
+        "pattern": pattern,
+        "pattern_type": "stix",
+        "pattern_version": "2.1",
+        "valid_from": timestamp,
+    })
+    return indicator
+
+
+def stix_vulnerability_dict(
+    name: str, description: str, source_name: str, url: str, timestamp: str
+) -> Dict[str, Any]:
+    """The dict stix2.Vulnerability(...).serialize() would produce, with one external reference."""
+    return {
+        "type": "vulnerability",
+        "spec_version": "2.1",
+        "id": f"vulnerability--{uuid.uuid4()}",
+        "created": timestamp,
+        "modified": timestamp,
+        "name": name,
+        "description": description,
+        "external_references": [
+            {"source_name": source_name, "url": url, "external_id": name}
+        ],
+    }
+
+
+def parse_json_body(response: requests.Response) -> Any:
+    """Decode a feed response with orjson; malformed bodies raise a RequestException like .json() does."""
+    try:
+        return orjson.loads(response.content)
+    except orjson.JSONDecodeError as e:
+        raise requests.exceptions.InvalidJSONError(str(e), response=response) from e
+
+
+# NVD CVSS metric blocks, most preferred first
+_CVSS_METRIC_KEYS = ("cvssMetricV31", "cvssMetricV30")
+
+
+def _extract_cvss(metrics: Dict[str, Any]) -> tuple:
+    """(base score, base severity) from the newest CVSS v3 metric NVD reports, else (None, "UNKNOWN")."""
+    for key in _CVSS_METRIC_KEYS:
+        entries = metrics.get(key)
+        if entries:
+            cvss_data = entries[0].get("cvssData", {})
+            return cvss_data.get("baseScore"), cvss_data.get("baseSeverity", "UNKNOWN")
+    return None, "UNKNOWN"
+
+
+GITHUB_ADVISORIES_QUERY = """
+query($first: Int!, $after: String) {
+    securityAdvisories(first: $first, after: $after, orderBy: {field: PUBLISHED_AT, direction: DESC}) {
+        nodes {
+            ghsaId
+            summary
+            description
+            severity
+            vulnerabilities(first: 10) {
+                nodes {
+                    package {
+                        ecosystem
+                        name
+                    }
+                }
+            }
+            cvss {
+                score
+            }
+            references {
+                url
+            }
+        }
+        pageInfo {
+            hasNextPage
+            endCursor
+        }
+    }
+}
+"""
+
+
+# Guards lazy per-class session creation: agents of one class collect on several threads at once
+_HTTP_LOCK = threading.Lock()
+
+
+def build_http_session() -> requests.Session:
+    """Keep-alive session with bounded connection pools and retry/backoff on transient 5xx/429."""
+    session = requests.Session()
+    session.headers.update({"User-Agent": "cAIber/1.0", "Accept": "application/json"})
+    retry = Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "POST"}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
 
 
 class BaseAgent:
+    # Items requested from the upstream feed per search
+    items_per_search = 50
+    # Key into FEED_TTLS for the on-disk response cache (None disables caching)
+    cache_source = None
+    # One session per agent class, shared by every instance so connections survive across requests
+    _http: Optional[requests.Session] = None
+
     def __init__(self, keywords: Dict[str, List[str]] = None):
         # Accept dict directly
         self.dna_keywords_dict = keywords or {
@@ -25,57 +325,118 @@ class BaseAgent:
         }
         # Flattened set for internal filtering
         self.dna_keywords = flatten_keywords(self.dna_keywords_dict)
+        # Built lazily so ThreatLandscapeBuilder can share one automaton across agents
+        self._matcher = None
+        # Request/API errors seen by the fetchers; only these count against provider health
+        self.fetch_errors = 0
+
+    @property
+    def matcher(self) -> KeywordMatcher:
+        if self._matcher is None:
+            self._matcher = get_matcher(self.dna_keywords)
+        return self._matcher
+
+    @matcher.setter
+    def matcher(self, matcher: KeywordMatcher):
+        self._matcher = matcher
+
+    @property
+    def http(self) -> requests.Session:
+        cls = type(self)
+        session = cls.__dict__.get("_http")
+        if session is None:
+            with _HTTP_LOCK:
+                session = cls.__dict__.get("_http")
+                if session is None:
+                    session = cls._http = build_http_session()
+        return session
 
     def collect(self):
         raise NotImplementedError
 
-    def process(self, raw_data):
+    def cached_fetch(self, query: Dict[str, Any], fetch):
+        """Return fetch() from the on-disk feed cache when a fresh copy of this query exists."""
+        if self.cache_source is None:
+            return fetch()
+        cached = feed_cache.get(self.cache_source, query, FEED_TTLS[self.cache_source])
+        if cached is not None:
+            print(f"INFO: Using cached {self.cache_source} response ({len(cached)} items)")
+            return cached
+        result = fetch()
+        if result:
+            feed_cache.set(self.cache_source, query, result)
+        return result
+
+    def process(self, raw_data, timestamp: Optional[str] = None):
+        """Filter raw feed items into STIX-shaped dicts stamped with timestamp (default: now)."""
         raise NotImplementedError
 
-    def run(self):
-        raw_data = self.collect()
+    @property
+    def provider_name(self) -> str:
+        return self.__class__.__name__
+
+    async def fetch(self, timestamp: Optional[str] = None):
+        """Run this agent's blocking collect/process cycle without holding the event loop."""
+        return await asyncio.to_thread(self.run, timestamp)
+
+    def run(self, timestamp: Optional[str] = None):
+        # A raised exception or a request/API error counts against provider health; an empty feed does not
+        start = time.monotonic()
+        errors_before = self.fetch_errors
+        ok = False
+        try:
+            raw_data = self.collect()
+            ok = self.fetch_errors == errors_before
+        finally:
+            provider_health.record(self.provider_name, time.monotonic() - start, ok)
         structured_intelligence = []
         if raw_data:
-            structured_intelligence = self.process(raw_data)
+            structured_intelligence = self.process(raw_data, timestamp)
         return structured_intelligence
 
 
 class OTXAgent(BaseAgent):
+    cache_source = "otx"
+
     def __init__(self, api_key, keywords=None):
         super().__init__(keywords)
         self.api_key = api_key
         self.base_url = "https://otx.alienvault.com/api/v1/pulses/subscribed"
 
     def collect(self):
+        return self.cached_fetch({"limit": self.items_per_search}, self._fetch_pulses)
+
+    def _fetch_pulses(self):
         """Collects recent threat pulses from AlienVault OTX and prints the date range."""
         print("INFO: Collecting data from AlienVault OTX...")
         headers = {"X-OTX-API-KEY": self.api_key}
         try:
-            response = requests.get(self.base_url, headers=headers, params={"limit": 50})
+            response = self.http.get(self.base_url, headers=headers, params={"limit": self.items_per_search}, timeout=30)
             response.raise_for_status()
-            results = response.json().get("results", [])
+            results = parse_json_body(response).get("results", [])
 
             if not results:
                 print("WARNING: No pulses returned.")
                 return None
 
-            # Extract created dates
-            dates = [
-                datetime.fromisoformat(pulse["created"].replace("Z", "+00:00"))
-                for pulse in results
-                if "created" in pulse
-            ]
+            # ISO-8601 timestamps order lexicographically, so only the two extremes get parsed
+            created = [pulse["created"] for pulse in results if "created" in pulse]
 
-            if dates:
+            if created:
+                first, last = (
+                    datetime.fromisoformat(value.replace("Z", "+00:00"))
+                    for value in (min(created), max(created))
+                )
                 print(
-                    f"INFO: Feed covers from {min(dates)} to {max(dates)} "
-                    f"({(max(dates)-min(dates)).days} days span)"
+                    f"INFO: Feed covers from {first} to {last} "
+                    f"({(last - first).days} days span)"
                 )
             else:
                 print("WARNING: No 'created' dates found in pulses.")
 
             return results
         except requests.exceptions.RequestException as e:
+            self.fetch_errors += 1
             print(f"ERROR: Could not collect data from OTX. {e}")
             return None
 
@@ -85,61 +446,60 @@ class OTXAgent(BaseAgent):
 
     def map_indicator_type(self, ind_type: str, ind_val: str) -> str:
         """Map OTX indicator types to valid STIX patterns"""
-        mapping = {
-            "IPv4": "ipv4-addr:value",
-            "IPv6": "ipv6-addr:value",
-            "domain": "domain-name:value",
-            "hostname": "domain-name:value",
-            "URL": "url:value",
-            "FileHash-SHA256": "file:hashes.'SHA-256'",
-            "FileHash-SHA1": "file:hashes.'SHA-1'",
-            "FileHash-MD5": "file:hashes.'MD5'",
-            "Email": "email-addr:value",
-        }
-        return mapping.get(ind_type, "artifact:payload_bin")  # fallback
+        stix_path = _STIX_TYPE_MAP.get(ind_type)
+        if stix_path is None:
+            # Unknown/missing OTX type: sniff the value itself before falling back
+            stix_path = _SNIFFED_STIX_PATHS.get(sniff_ioc_type(ind_val))
+        return stix_path or "artifact:payload_bin"  # fallback
 
-    def process(self, raw_pulses):
+    def process(self, raw_pulses, timestamp: Optional[str] = None):
         print("INFO: Processing raw data and filtering based on DNA keywords...")
         relevant_indicators = []
+        # Shared by every indicator built in this batch
+        timestamp = timestamp or stix_timestamp()
         for pulse in raw_pulses:
-            pulse_text = pulse.get("name", "") + " " + pulse.get("description", "")
-
-            if any(kw in pulse_text.lower() for kw in self.dna_keywords):
+            # Fields are scanned separately: no joined copy, and the short name usually decides
+            if self.matcher.matches_any((pulse.get("name", ""), pulse.get("description", ""))):
+                pulse_info = {
+                    "name": pulse.get("name", ""),
+                    "description": pulse.get("description", "")[:200] if pulse.get("description") else ""
+                }
                 for indicator in pulse.get("indicators", []):
                     stix_type = self.map_indicator_type(
                         indicator.get("type", ""), indicator.get("indicator", "")
                     )
                     stix_value = self.safe_stix_value(indicator.get("indicator", ""))
 
-                    try:
-                        stix_indicator = Indicator(
-                            name=pulse.get("name"),
-                            pattern_type="stix",
-                            pattern=f"[{stix_type} = '{stix_value}']",
-                            description=pulse.get("description", ""),
-                        )
-                        
-                        # Convert to dict and add frontend-friendly fields
-                        stix_dict = json.loads(stix_indicator.serialize())
-                        stix_dict.update({
-                            "type": indicator.get("type", "unknown"),  # Original OTX indicator type
-                            "indicator": indicator.get("indicator", ""),  # Original indicator value
-                            "pulse": pulse.get("name", ""),  # Pulse name for context
-                            "created": indicator.get("created", pulse.get("created", "")),  # Creation date
-                            "pulse_info": {
-                                "name": pulse.get("name", ""),
-                                "description": pulse.get("description", "")[:200] if pulse.get("description") else ""
-                            }
-                        })
-                        
-                        relevant_indicators.append(stix_dict)
-                    except Exception as e:
-                        print(f"[OTX] Skipped bad indicator {indicator}: {e}")
+                    stix_dict = stix_indicator_dict(
+                        name=pulse.get("name"),
+                        pattern=f"[{stix_type} = '{stix_value}']",
+                        description=pulse.get("description", ""),
+                        timestamp=timestamp,
+                    )
+
+                    # Add frontend-friendly fields
+                    stix_dict.update({
+                        "type": indicator.get("type", "unknown"),  # Original OTX indicator type
+                        "indicator": indicator.get("indicator", ""),  # Original indicator value
+                        "pulse": pulse.get("name", ""),  # Pulse name for context
+                        "created": indicator.get("created", pulse.get("created", "")),  # Creation date
+                        "pulse_info": dict(pulse_info)
+                    })
+
+                    relevant_indicators.append(stix_dict)
         return relevant_indicators
 
 
 class CVEAgent(BaseAgent):
     """CVE database integration for vulnerability intelligence using NVD API"""
+    cache_source = "cve"
+    # Pages of items_per_search results fetched per collection; pages after the first are
+    # requested concurrently (NVD rate-limits to 5 requests/30s without an API key)
+    max_pages = int(os.getenv("CAIBER_NVD_MAX_PAGES", "1"))
+    # Push DNA keywords to NVD's keywordSearch (one search per keyword, at most
+    # max_keyword_searches) instead of pulling the whole window and filtering locally
+    keyword_search = os.getenv("CAIBER_NVD_KEYWORD_SEARCH", "0") == "1"
+    max_keyword_searches = 10
 
     def __init__(self, api_key=None, keywords=None):
         super().__init__(keywords)
@@ -147,6 +507,55 @@ class CVEAgent(BaseAgent):
         self.base_url = "https://services.nvd.nist.gov/rest/json/cves/2.0"
 
     def collect(self):
+        query = {
+            "days": 30,
+            "date": datetime.now().strftime("%Y-%m-%d"),
+            "resultsPerPage": self.items_per_search,
+            "pages": self.max_pages,
+            "keywordSearch": self._search_keywords(),
+        }
+        return self.cached_fetch(query, self._fetch_cves)
+
+    def _search_keywords(self) -> List[str]:
+        """DNA keywords to push to NVD's keywordSearch, or [] to pull the unfiltered window."""
+        if not self.keyword_search or self.dna_keywords == DEFAULT_KEYWORDS:
+            return []
+        return sorted(self.dna_keywords)[:self.max_keyword_searches]
+
+    def _fetch_page(self, params: Dict[str, Any], headers: Dict[str, str], start_index: int) -> Dict[str, Any]:
+        response = self.http.get(
+            self.base_url, params={**params, "startIndex": start_index}, headers=headers, timeout=30
+        )
+        response.raise_for_status()
+        return parse_json_body(response)
+
+    def _fetch_paged(self, params: Dict[str, Any], headers: Dict[str, str]) -> Optional[List[Dict[str, Any]]]:
+        """Up to max_pages pages of one NVD search; None if the first page fails."""
+        try:
+            first_page = self._fetch_page(params, headers, 0)
+        except requests.exceptions.RequestException as e:
+            self.fetch_errors += 1
+            status = e.response.status_code if e.response is not None else "No response"
+            print(f"[CVE] API Error: {status} - {e}")
+            return None
+
+        vulnerabilities = first_page.get("vulnerabilities", [])
+        page_size = self.items_per_search
+        total = min(first_page.get("totalResults", 0), page_size * max(self.max_pages, 1))
+        starts = range(page_size, total, page_size)
+        if starts:
+            # Remaining pages in parallel, appended in page order; a failed page keeps what arrived
+            with ThreadPoolExecutor(max_workers=min(len(starts), 4)) as pool:
+                pages = [pool.submit(self._fetch_page, params, headers, start) for start in starts]
+                for start, page in zip(starts, pages):
+                    try:
+                        vulnerabilities.extend(page.result().get("vulnerabilities", []))
+                    except requests.exceptions.RequestException as e:
+                        self.fetch_errors += 1
+                        print(f"[CVE] Page at startIndex {start} failed: {e}")
+        return vulnerabilities
+
+    def _fetch_cves(self):
         """Collects recent CVEs from NVD (National Vulnerability Database)"""
         end_date = datetime.now()
         start_date = end_date - timedelta(days=30)
@@ -154,27 +563,34 @@ class CVEAgent(BaseAgent):
         params = {
             "lastModStartDate": start_date.strftime("%Y-%m-%dT00:00:00.000"),
             "lastModEndDate": end_date.strftime("%Y-%m-%dT23:59:59.999"),
-            "resultsPerPage": 50,
+            "resultsPerPage": self.items_per_search,
         }
 
         headers = {}
         if self.api_key:
             headers["apiKey"] = self.api_key
 
-        try:
-            response = requests.get(
-                self.base_url, params=params, headers=headers, timeout=30
-            )
-            response.raise_for_status()
-            return response.json().get("vulnerabilities", [])
-        except requests.exceptions.RequestException as e:
-            print(
-                f"[CVE] API Error: {response.status_code if 'response' in locals() else 'No response'} - {e}"
-            )
+        keywords = self._search_keywords()
+        if not keywords:
+            return self._fetch_paged(params, headers)
+
+        # Server-side filtering: one search per keyword, merged and deduplicated on CVE id.
+        # Two at a time keeps keyless clients near NVD's rate limit
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            results = list(pool.map(
+                lambda kw: self._fetch_paged({**params, "keywordSearch": kw}, headers), keywords
+            ))
+        if all(result is None for result in results):
             return None
+        unique = {}
+        for result in results:
+            for item in result or []:
+                unique.setdefault(item.get("cve", {}).get("id"), item)
+        return list(unique.values())
 
-    def process(self, raw_cves):
+    def process(self, raw_cves, timestamp: Optional[str] = None):
         relevant_vulnerabilities = []
+        timestamp = timestamp or stix_timestamp()
 
         for cve_item in raw_cves:
             cve = cve_item.get("cve", {})
@@ -185,35 +601,16 @@ class CVEAgent(BaseAgent):
                 [d.get("value", "") for d in descriptions if d.get("lang") == "en"]
             )
 
-            search_text = f"{cve_id} {description_text}".lower()
-
-            if any(kw in search_text for kw in self.dna_keywords):
-                metrics = cve.get("metrics", {})
-                cvss_score = None
-                severity = "UNKNOWN"
-
-                if "cvssMetricV31" in metrics:
-                    cvss_data = metrics["cvssMetricV31"][0] if metrics["cvssMetricV31"] else {}
-                    cvss_score = cvss_data.get("cvssData", {}).get("baseScore")
-                    severity = cvss_data.get("cvssData", {}).get("baseSeverity", "UNKNOWN")
-                elif "cvssMetricV30" in metrics:
-                    cvss_data = metrics["cvssMetricV30"][0] if metrics["cvssMetricV30"] else {}
-                    cvss_score = cvss_data.get("cvssData", {}).get("baseScore")
-                    severity = cvss_data.get("cvssData", {}).get("baseSeverity", "UNKNOWN")
+            if self.matcher.matches_any((cve_id, description_text)):
+                cvss_score, severity = _extract_cvss(cve.get("metrics", {}))
 
-                stix_vuln = Vulnerability(
+                vuln_dict = stix_vulnerability_dict(
                     name=cve_id,
                     description=description_text[:500] if description_text else "No description available",
-                    external_references=[
-                        {
-                            "source_name": "NVD",
-                            "external_id": cve_id,
-                            "url": f"https://nvd.nist.gov/vuln/detail/{cve_id}",
-                        }
-                    ],
+                    source_name="NVD",
+                    url=f"https://nvd.nist.gov/vuln/detail/{cve_id}",
+                    timestamp=timestamp,
                 )
-
-                vuln_dict = json.loads(stix_vuln.serialize())
                 vuln_dict["x_cvss_score"] = cvss_score
                 vuln_dict["x_severity"] = severity
 
@@ -224,6 +621,9 @@ class CVEAgent(BaseAgent):
 
 class GitHubSecurityAgent(BaseAgent):
     """GitHub Security Advisories for open source vulnerabilities"""
+    cache_source = "github"
+    # Pages of items_per_search advisories fetched per collection (newest first)
+    max_pages = int(os.getenv("CAIBER_GITHUB_MAX_PAGES", "1"))
 
     def __init__(self, github_token=None, keywords=None):
         super().__init__(keywords)
@@ -231,57 +631,54 @@ class GitHubSecurityAgent(BaseAgent):
         self.base_url = "https://api.github.com/graphql"
 
     def collect(self):
-        query = """
-        query {
-            securityAdvisories(first: 50, orderBy: {field: PUBLISHED_AT, direction: DESC}) {
-                nodes {
-                    ghsaId
-                    summary
-                    description
-                    severity
-                    vulnerabilities(first: 10) {
-                        nodes {
-                            package {
-                                ecosystem
-                                name
-                            }
-                        }
-                    }
-                    cvss {
-                        score
-                    }
-                    references {
-                        url
-                    }
-                }
-            }
-        }
-        """
+        query = {"first": self.items_per_search, "pages": self.max_pages}
+        return self.cached_fetch(query, self._fetch_advisories)
 
+    def _fetch_advisories(self):
         headers = {"Content-Type": "application/json"}
         if self.github_token:
             headers["Authorization"] = f"Bearer {self.github_token}"
 
-        try:
-            response = requests.post(
-                self.base_url, json={"query": query}, headers=headers, timeout=30
-            )
-            response.raise_for_status()
-            data = response.json()
+        advisories = []
+        cursor = None
+        # Cursor pagination: each page needs the previous page's endCursor, so pages are sequential
+        for page in range(max(self.max_pages, 1)):
+            try:
+                response = self.http.post(
+                    self.base_url,
+                    json={
+                        "query": GITHUB_ADVISORIES_QUERY,
+                        "variables": {"first": self.items_per_search, "after": cursor},
+                    },
+                    headers=headers,
+                    timeout=30,
+                )
+                response.raise_for_status()
+                data = parse_json_body(response)
+            except requests.exceptions.RequestException as e:
+                self.fetch_errors += 1
+                status = e.response.status_code if e.response is not None else "No response"
+                print(f"[GitHub] API Error: {status} - {e}")
+                # Keep earlier pages; fail the collection only if nothing arrived
+                return advisories or None
 
             if "errors" in data:
+                self.fetch_errors += 1
                 print(f"[GitHub] API Errors: {data['errors']}")
-                return None
+                return advisories or None
 
-            return data.get("data", {}).get("securityAdvisories", {}).get("nodes", [])
-        except requests.exceptions.RequestException as e:
-            print(
-                f"[GitHub] API Error: {response.status_code if 'response' in locals() else 'No response'} - {e}"
-            )
-            return None
+            connection = data.get("data", {}).get("securityAdvisories", {})
+            advisories.extend(connection.get("nodes", []))
+            page_info = connection.get("pageInfo", {})
+            if not page_info.get("hasNextPage"):
+                break
+            cursor = page_info.get("endCursor")
 
-    def process(self, raw_advisories):
+        return advisories
+
+    def process(self, raw_advisories, timestamp: Optional[str] = None):
         relevant_advisories = []
+        timestamp = timestamp or stix_timestamp()
 
         for advisory in raw_advisories:
             ghsa_id = advisory.get("ghsaId", "")
@@ -298,25 +695,17 @@ class GitHubSecurityAgent(BaseAgent):
                         f"{package.get('ecosystem', '')}/{package.get('name', '')}"
                     )
 
-            search_text = f"{ghsa_id} {summary} {description} {' '.join(affected_packages)}".lower()
-
-            if any(kw in search_text for kw in self.dna_keywords):
+            if self.matcher.matches_any((ghsa_id, summary, description, *affected_packages)):
                 cvss = advisory.get("cvss", {})
                 cvss_score = cvss.get("score") if cvss else None
 
-                stix_vuln = Vulnerability(
+                vuln_dict = stix_vulnerability_dict(
                     name=ghsa_id,
                     description=f"{summary}. {description[:400] if description else ''}",
-                    external_references=[
-                        {
-                            "source_name": "GitHub Advisory",
-                            "external_id": ghsa_id,
-                            "url": f"https://github.com/advisories/{ghsa_id}",
-                        }
-                    ],
+                    source_name="GitHub Advisory",
+                    url=f"https://github.com/advisories/{ghsa_id}",
+                    timestamp=timestamp,
                 )
-
-                vuln_dict = json.loads(stix_vuln.serialize())
                 
                 # Add frontend-friendly fields
                 vuln_dict.update({
@@ -337,13 +726,89 @@ class GitHubSecurityAgent(BaseAgent):
 
 
 class ThreatLandscapeBuilder:
-    def __init__(self, collection_agents: List[BaseAgent], pir_keywords: dict = None):
+    def __init__(self, collection_agents: List[BaseAgent], pir_keywords: dict = None, parquet_path: str = None):
         self.agents = collection_agents
         self.pir_keywords = pir_keywords or {}
+        # When set, the assembled landscape is also written there as a columnar Parquet table
+        self.parquet_path = parquet_path
+        self.degraded_providers: List[str] = []
+        self._share_matchers()
+
+    def _share_matchers(self):
+        """Hand every agent the cached automaton for its keyword set (compiled once per distinct set)."""
+        for agent in self.agents:
+            agent.matcher = get_matcher(agent.dna_keywords)
 
     def build_threat_landscape(self) -> Dict[str, Any]:
+        """Synchronous entry point for callers without a running event loop."""
+        return asyncio.run(self.build_threat_landscape_async())
+
+    async def build_threat_landscape_async(self, concurrent_searches: int = 8) -> Dict[str, Any]:
+        """Run every agent concurrently so collection takes max(agent latency) instead of the sum."""
         print("INFO: Building comprehensive threat landscape...")
 
+        semaphore = asyncio.Semaphore(max(1, concurrent_searches))
+        # Every STIX object of this build carries the same created/modified time
+        timestamp = stix_timestamp()
+
+        async def run_agent(agent: BaseAgent):
+            async with semaphore:
+                print(f"INFO: Collecting from {agent.__class__.__name__}...")
+                return await agent.fetch(timestamp)
+
+        agents = self._healthy_agents()
+        results = await asyncio.gather(
+            *(run_agent(agent) for agent in agents), return_exceptions=True
+        )
+        return self.merge(zip(agents, results))
+
+    def _healthy_agents(self) -> List[BaseAgent]:
+        """Drop providers whose recent error rate or p95 latency breaches the health gate."""
+        self.degraded_providers = provider_health.degraded([a.provider_name for a in self.agents])
+        if self.degraded_providers:
+            print(f"WARNING: Skipping degraded providers: {', '.join(self.degraded_providers)}")
+        return [a for a in self.agents if a.provider_name not in self.degraded_providers]
+
+    async def stream_threats(self, concurrent_searches: int = 8) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield threats as each agent finishes, skipping content duplicates,
+        without materializing the combined landscape.
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrent_searches))
+        timestamp = stix_timestamp()
+
+        async def run_agent(agent: BaseAgent):
+            async with semaphore:
+                print(f"INFO: Collecting from {agent.__class__.__name__}...")
+                try:
+                    return agent, await agent.fetch(timestamp)
+                except Exception as e:
+                    return agent, e
+
+        # Same de-duplication as merge(); a later duplicate's pulses and CVSS data are merged into the
+        # copy already yielded (the same dict), so consumers holding it see them
+        unique_iocs: Dict[tuple, Dict] = {}
+        unique_vulns: Dict[tuple, Dict] = {}
+        for next_done in asyncio.as_completed([run_agent(agent) for agent in self._healthy_agents()]):
+            agent, threat_data = await next_done
+            if isinstance(threat_data, Exception):
+                print(f"ERROR: Failed to collect from {agent.__class__.__name__}: {threat_data}")
+                continue
+            for item in threat_data or []:
+                if item.get("type", "") == "vulnerability":
+                    unique, add_unique = unique_vulns, add_unique_vulnerability
+                else:
+                    unique, add_unique = unique_iocs, add_unique_indicator
+                size = len(unique)
+                add_unique(unique, item)
+                if len(unique) > size:
+                    yield item
+
+    def merge(self, agent_results) -> Dict[str, Any]:
+        """
+        CPU-side assembly of already-fetched agent payloads: (agent, items or Exception) pairs
+        are classified, de-duplicated and summarized into one threat landscape.
+        """
         threat_landscape = {
             "indicators": [],
             "vulnerabilities": [],
@@ -351,42 +816,35 @@ class ThreatLandscapeBuilder:
             "sources": [],
             "total_items": 0,
             "keywords": self.pir_keywords,
+            "degraded_providers": list(self.degraded_providers),
         }
 
-        for agent in self.agents:
+        # Items are classified and de-duplicated in the same pass (see normalize_landscape)
+        unique_iocs: Dict[tuple, Dict] = {}
+        unique_vulns: Dict[tuple, Dict] = {}
+        for agent, threat_data in agent_results:
             agent_name = agent.__class__.__name__
-            print(f"INFO: Collecting from {agent_name}...")
 
-            try:
-                threat_data = agent.run()
+            if isinstance(threat_data, Exception):
+                print(f"ERROR: Failed to collect from {agent_name}: {threat_data}")
+                continue
 
-                if threat_data:
-                    for item in threat_data:
-                        stix_type = item.get("type", "")
+            if threat_data:
+                for item in threat_data:
+                    if item.get("type", "") == "vulnerability":
+                        add_unique_vulnerability(unique_vulns, item)
+                    else:
+                        add_unique_indicator(unique_iocs, item)
 
-                        if stix_type == "indicator":
-                            threat_landscape["indicators"].append(item)
-                        elif stix_type == "vulnerability":
-                            threat_landscape["vulnerabilities"].append(item)
-                        else:
-                            threat_landscape["indicators"].append(item)
+                threat_landscape["sources"].append(agent_name)
 
-                    threat_landscape["sources"].append(agent_name)
+        set_landscape_items(threat_landscape, unique_iocs, unique_vulns)
 
+        if self.parquet_path:
+            try:
+                threat_landscape["parquet_path"] = write_landscape_parquet(threat_landscape, self.parquet_path)
             except Exception as e:
-                print(f"ERROR: Failed to collect from {agent_name}: {e}")
-                continue
-
-        threat_landscape["indicators"] = self._deduplicate_items(
-            threat_landscape["indicators"]
-        )
-        threat_landscape["vulnerabilities"] = self._deduplicate_items(
-            threat_landscape["vulnerabilities"]
-        )
-
-        threat_landscape["total_items"] = len(threat_landscape["indicators"]) + len(
-            threat_landscape["vulnerabilities"]
-        )
+                print(f"ERROR: Parquet landscape export failed: {e}")
 
         print(f"SUCCESS: Built threat landscape with {threat_landscape['total_items']} unique items")
         print(f"  - Indicators: {len(threat_landscape['indicators'])}")
@@ -394,15 +852,3 @@ class ThreatLandscapeBuilder:
         print(f"  - Sources: {', '.join(threat_landscape['sources'])}")
 
         return threat_landscape
-
-    def _deduplicate_items(self, items: List[Dict]) -> List[Dict]:
-        seen = set()
-        unique_items = []
-
-        for item in items:
-            identifier = item.get("id") or item.get("name", "")
-            if identifier and identifier not in seen:
-                seen.add(identifier)
-                unique_items.append(item)
-
-        return unique_items
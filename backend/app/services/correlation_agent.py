@@ -4,15 +4,129 @@ Correlates threats with organizational context to produce risk assessments
 """
 
 import os
-from typing import Dict, Any, List
-from neo4j import GraphDatabase
+import hashlib
+from operator import itemgetter
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple, Type, TypeVar
+from neo4j import GraphDatabase, READ_ACCESS
 from langchain_openai import ChatOpenAI
+from pydantic import BaseModel
 from dotenv import load_dotenv
 from .logger_config import logger
+from .feed_cache import FeedCache
 
 load_dotenv()
 
-llm = ChatOpenAI(temperature=0, model_name="gpt-4o")
+# JSON mode: every reply is a single JSON object, so no fence/prose stripping before parsing
+llm = ChatOpenAI(temperature=0, model_name="gpt-4o", model_kwargs={"response_format": {"type": "json_object"}})
+
+
+class RiskAssessment(BaseModel):
+    affected_assets: List[str] = []
+    business_impact: str = ""
+    # The model sometimes answers 7.5; accepted here and rounded onto the 0-10 scale in as_dict
+    risk_score: float = 0
+    reasoning: str = ""
+
+    def as_dict(self) -> Dict[str, Any]:
+        assessment = self.model_dump(exclude={'index'})
+        assessment['risk_score'] = min(10, max(0, round(self.risk_score)))
+        return assessment
+
+
+class IndexedRiskAssessment(RiskAssessment):
+    index: int
+
+
+class WindowAssessment(BaseModel):
+    assessments: List[IndexedRiskAssessment] = []
+
+
+# Threats assessed per LLM request; windows are sent concurrently via llm.batch
+ASSESSMENT_WINDOW = 32
+
+# Technologies, business initiatives and geographic presence in a single query; each branch
+# keeps its own ORDER BY/LIMIT inside the CALL subquery
+ORG_CONTEXT_QUERY = """
+    CALL {
+        MATCH (n:Entity {type: 'technology'})
+        RETURN 'technology' AS kind, n.name AS name, n.importance AS importance
+        ORDER BY n.importance DESC
+        LIMIT 20
+      UNION ALL
+        MATCH (n:Entity {type: 'business_initiative'})
+        RETURN 'business_initiative' AS kind, n.name AS name, n.importance AS importance
+        LIMIT 10
+      UNION ALL
+        MATCH (n:Entity {type: 'geography'})
+        RETURN 'geography' AS kind, n.name AS name, null AS importance
+        LIMIT 10
+    }
+    RETURN kind, name, importance
+"""
+
+# Concurrent per-threat fallback calls, kept under OpenAI rate limits
+FALLBACK_WORKERS = 8
+
+# temperature=0 replies keyed on (model, prompt hash); NVD keeps returning the same CVEs across runs
+LLM_CACHE_TTL = 24 * 60 * 60
+_llm_cache = FeedCache(
+    directory=os.getenv("CAIBER_LLM_CACHE", os.path.join(tempfile.gettempdir(), "caiber_llm"))
+)
+_llm_cache_stats = {"hits": 0, "misses": 0}
+
+
+# (system message, user message); the system message carries the shared org-context prefix
+Prompt = Tuple[str, str]
+Reply = TypeVar("Reply", bound=BaseModel)
+
+
+def _messages(prompt: Prompt) -> List[Tuple[str, str]]:
+    return [("system", prompt[0]), ("human", prompt[1])]
+
+
+def _llm_cache_key(prompt: Prompt) -> Dict[str, str]:
+    digest = hashlib.sha256("\0".join(prompt).encode("utf-8")).hexdigest()
+    return {"model": llm.model_name, "prompt": digest}
+
+
+def llm_cache_stats() -> dict:
+    lookups = _llm_cache_stats["hits"] + _llm_cache_stats["misses"]
+    return {
+        **_llm_cache_stats,
+        "hit_rate": round(_llm_cache_stats["hits"] / lookups, 3) if lookups else 0.0,
+    }
+
+
+def _validate(schema: Type[Reply], content: str) -> Any:
+    """The reply parsed as schema, or the exception validation raised."""
+    try:
+        return schema.model_validate_json(content)
+    except Exception as e:
+        return e
+
+
+def _cached_llm_batch(prompts: List[Prompt], schema: Type[Reply]) -> List[Any]:
+    """
+    llm.batch over the prompts without a cached reply; returns the reply validated as schema (or the
+    exception) per prompt. Only replies that validate are cached, so a malformed one is retried next run.
+    """
+    cached = [_llm_cache.get("llm", _llm_cache_key(p), LLM_CACHE_TTL) for p in prompts]
+    replies: List[Any] = [None if text is None else _validate(schema, text) for text in cached]
+    missing = [i for i, text in enumerate(cached) if text is None]
+    _llm_cache_stats["hits"] += len(prompts) - len(missing)
+    _llm_cache_stats["misses"] += len(missing)
+    if missing:
+        responses = llm.batch([_messages(prompts[i]) for i in missing], return_exceptions=True)
+        for i, response in zip(missing, responses):
+            if isinstance(response, Exception):
+                replies[i] = response
+                continue
+            replies[i] = _validate(schema, response.content)
+            if not isinstance(replies[i], Exception):
+                _llm_cache.set("llm", _llm_cache_key(prompts[i]), response.content)
+    return replies
 
 
 class CorrelationAgent:
@@ -61,26 +175,28 @@ class CorrelationAgent:
         # Get organizational context
         org_context = self._get_organizational_context()
         
-        # Process vulnerabilities
         vulnerabilities = threat_landscape.get('vulnerabilities', [])
-        logger.info(f"Correlating {len(vulnerabilities)} vulnerabilities")
+        indicators = threat_landscape.get('indicators', [])
+        logger.info(f"Correlating {len(vulnerabilities)} vulnerabilities and {len(indicators)} threat indicators")
         
-        for vuln in vulnerabilities[:10]:  # Limit to top 10 for performance
-            risk = self._assess_vulnerability_risk(vuln, org_context)
-            if risk:
-                risk_assessments.append(risk)
+        # Limit to top 10 of each for performance
+        threats = [('vulnerability', v) for v in vulnerabilities[:10]] + \
+                  [('indicator', i) for i in indicators[:10]]
         
-        # Process indicators
-        indicators = threat_landscape.get('indicators', [])
-        logger.info(f"Correlating {len(indicators)} threat indicators")
+        # One prompt per window of threats instead of one LLM round-trip per threat
+        windows = [threats[i:i + ASSESSMENT_WINDOW] for i in range(0, len(threats), ASSESSMENT_WINDOW)]
+        # Org context goes in an identical system message on every call, so the provider's prefix cache applies
+        system_prompt = self._system_prompt(org_context)
+        prompts = [self._build_window_prompt(window, system_prompt) for window in windows]
+        responses = _cached_llm_batch(prompts, WindowAssessment) if prompts else []
         
-        for indicator in indicators[:10]:  # Limit to top 10
-            risk = self._assess_indicator_risk(indicator, org_context)
-            if risk:
-                risk_assessments.append(risk)
+        for window, response in zip(windows, responses):
+            for risk in self._parse_window_response(window, response, system_prompt):
+                if risk:
+                    risk_assessments.append(risk)
         
-        # Sort by risk score
-        risk_assessments.sort(key=lambda x: x['risk_score'], reverse=True)
+        # Sort by risk score; every assessment carries one (RiskAssessment default 0), so a C-level key suffices
+        risk_assessments.sort(key=itemgetter('risk_score'), reverse=True)
         
         logger.info(f"Generated {len(risk_assessments)} risk assessments")
         return risk_assessments
@@ -94,72 +210,143 @@ class CorrelationAgent:
             'critical_assets': []
         }
         
-        with self.driver.session() as session:
-            # Get technologies
-            result = session.run("""
-                MATCH (n:Entity {type: 'technology'})
-                RETURN n.name as name, n.importance as importance
-                ORDER BY n.importance DESC
-                LIMIT 20
-            """)
-            context['technologies'] = [dict(record) for record in result]
-            
-            # Get business initiatives
-            result = session.run("""
-                MATCH (n:Entity {type: 'business_initiative'})
-                RETURN n.name as name, n.importance as importance
-                LIMIT 10
-            """)
-            context['business_initiatives'] = [dict(record) for record in result]
-            
-            # Get geographic presence
-            result = session.run("""
-                MATCH (n:Entity {type: 'geography'})
-                RETURN n.name as name
-                LIMIT 10
-            """)
-            context['geographic_presence'] = [record['name'] for record in result]
+        # One round trip for all three context lists, tagged by kind and split back out here
+        with self.driver.session(default_access_mode=READ_ACCESS) as session:
+            for record in session.run(ORG_CONTEXT_QUERY):
+                if record['kind'] == 'technology':
+                    context['technologies'].append({'name': record['name'], 'importance': record['importance']})
+                elif record['kind'] == 'business_initiative':
+                    context['business_initiatives'].append({'name': record['name'], 'importance': record['importance']})
+                else:
+                    context['geographic_presence'].append(record['name'])
             
         logger.debug(f"Loaded organizational context: {len(context['technologies'])} technologies, {len(context['business_initiatives'])} initiatives")
         return context
     
-    def _assess_vulnerability_risk(self, vuln: Dict[str, Any], org_context: Dict[str, Any]) -> Dict[str, Any]:
-        """Assess risk of a specific vulnerability against organizational context"""
-        
-        vuln_name = vuln.get('name', 'Unknown')
-        vuln_description = vuln.get('description', '')
-        severity = vuln.get('x_severity', 'UNKNOWN')
-        cvss_score = vuln.get('x_cvss_score', 0)
-        
-        # Build context for LLM
+    def _system_prompt(self, org_context: Dict[str, Any]) -> str:
+        """Instructions plus org context, built once per correlation run so every call shares the same prefix"""
         tech_list = ', '.join([t['name'] for t in org_context['technologies'][:5]])
+        geo_list = ', '.join(org_context['geographic_presence'][:3])
         
-        prompt = f"""
-        Analyze this vulnerability against our organizational context and provide a risk assessment.
-        
-        Vulnerability: {vuln_name}
-        Description: {vuln_description[:200]}
-        Severity: {severity}
-        CVSS Score: {cvss_score}
+        return f"""
+        You assess cyber threats against our organizational context.
         
-        Our Organization Uses:
+        Our Organization:
         Technologies: {tech_list}
+        Locations: {geo_list}
         
-        Provide a JSON response with:
-        1. "affected_assets": List of our technologies/systems that could be affected
+        An assessment is a JSON object containing:
+        1. "affected_assets": List of our technologies/systems that could be affected or targeted
         2. "business_impact": Brief description of potential business impact
         3. "risk_score": Number 1-10 based on relevance to our organization
         4. "reasoning": One sentence explanation
         
-        If this vulnerability is not relevant to our technologies, return risk_score of 0.
+        If a threat is not relevant to our organization, give it a risk_score of 0.
         
         Respond with valid JSON only.
         """
+    
+    def _threat_block(self, threat_type: str, threat: Dict[str, Any], label: str = "") -> str:
+        if threat_type == 'vulnerability':
+            return (
+                f"{label}Vulnerability: {threat.get('name', 'Unknown')}\n"
+                f"    Description: {threat.get('description', '')[:200]}\n"
+                f"    Severity: {threat.get('x_severity', 'UNKNOWN')}\n"
+                f"    CVSS Score: {threat.get('x_cvss_score', 0)}"
+            )
+        return (
+            f"{label}Threat indicator: {threat.get('name', 'Unknown')}\n"
+            f"    Pattern: {threat.get('pattern', '')[:100]}\n"
+            f"    Description: {threat.get('description', '')[:200]}"
+        )
+    
+    def _build_window_prompt(self, window: List[Tuple[str, Dict[str, Any]]], system_prompt: str) -> Prompt:
+        """Single prompt asking for an assessment of every threat in the window"""
+        threats_block = "\n".join(
+            self._threat_block(threat_type, threat, f"[{idx}] ")
+            for idx, (threat_type, threat) in enumerate(window)
+        )
+        
+        return system_prompt, f"""
+        Assess each of these threats.
+        
+        Threats:
+{threats_block}
+        
+        Provide a JSON object {{"assessments": [...]}} with one assessment per threat, each also
+        containing "index": the number of the threat in brackets above.
+        """
+    
+    def _parse_window_response(self, window: List[Tuple[str, Dict[str, Any]]], response: Any,
+                               system_prompt: str) -> List[Optional[Dict[str, Any]]]:
+        """Map a batched reply (a WindowAssessment, or the exception raised) back onto its threats, assessing individually whatever it missed"""
+        by_index: Dict[int, Dict[str, Any]] = {}
+        if isinstance(response, Exception):
+            logger.debug(f"Batched assessment failed, falling back to per-threat calls: {response}")
+        else:
+            for item in response.assessments:
+                by_index[item.index] = item.as_dict()
+        
+        # Threats the batched reply missed are I/O-bound single calls, so issue them concurrently
+        missing = [idx for idx in range(len(window)) if idx not in by_index]
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(FALLBACK_WORKERS, len(missing))) as pool:
+                fallback = dict(zip(missing, pool.map(
+                    lambda idx: self._assess_single(*window[idx], system_prompt), missing
+                )))
+        
+        results = []
+        for idx, (threat_type, threat) in enumerate(window):
+            assessment = by_index.get(idx)
+            if assessment is None:
+                results.append(fallback[idx])
+                continue
+            
+            assessment['threat_type'] = threat_type
+            assessment['threat_id'] = threat.get('name', 'Unknown')
+            if threat_type == 'vulnerability':
+                assessment['original_severity'] = threat.get('x_severity', 'UNKNOWN')
+            results.append(assessment)
+        return results
+    
+    def _assess_single(self, threat_type: str, threat: Dict[str, Any],
+                       system_prompt: str) -> Optional[Dict[str, Any]]:
+        if threat_type == 'vulnerability':
+            return self._assess_vulnerability_risk(threat, system_prompt)
+        return self._assess_indicator_risk(threat, system_prompt)
+
+    def _llm_cached(self, prompt: Prompt, schema: Type[Reply]) -> Reply:
+        """Reply for a single prompt validated as schema, served from the on-disk LLM cache when fresh."""
+        key = _llm_cache_key(prompt)
+        cached = _llm_cache.get("llm", key, LLM_CACHE_TTL)
+        if cached is not None:
+            _llm_cache_stats["hits"] += 1
+            return schema.model_validate_json(cached)
+        _llm_cache_stats["misses"] += 1
+        content = llm.invoke(_messages(prompt)).content
+        # Raises on a malformed reply before it is cached
+        reply = schema.model_validate_json(content)
+        _llm_cache.set("llm", key, content)
+        return reply
+
+    def _single_prompt(self, threat_type: str, threat: Dict[str, Any], system_prompt: str) -> Prompt:
+        return system_prompt, f"""
+        Assess this threat.
+        
+        {self._threat_block(threat_type, threat)}
+        
+        Provide a single assessment object.
+        """
+
+    def _assess_vulnerability_risk(self, vuln: Dict[str, Any], system_prompt: str) -> Dict[str, Any]:
+        """Assess risk of a specific vulnerability against organizational context"""
+        
+        vuln_name = vuln.get('name', 'Unknown')
+        severity = vuln.get('x_severity', 'UNKNOWN')
         
         try:
-            response = llm.invoke(prompt)
-            import json
-            assessment = json.loads(response.content)
+            prompt = self._single_prompt('vulnerability', vuln, system_prompt)
+            assessment = self._llm_cached(prompt, RiskAssessment).as_dict()
             
             # Add vulnerability details
             assessment['threat_type'] = 'vulnerability'
@@ -172,43 +359,14 @@ class CorrelationAgent:
             logger.debug(f"Failed to assess {vuln_name}: {e}")
             return None
     
-    def _assess_indicator_risk(self, indicator: Dict[str, Any], org_context: Dict[str, Any]) -> Dict[str, Any]:
+    def _assess_indicator_risk(self, indicator: Dict[str, Any], system_prompt: str) -> Dict[str, Any]:
         """Assess risk of a threat indicator against organizational context"""
         
         indicator_name = indicator.get('name', 'Unknown')
-        pattern = indicator.get('pattern', '')
-        description = indicator.get('description', '')
-        
-        # Build context
-        tech_list = ', '.join([t['name'] for t in org_context['technologies'][:5]])
-        geo_list = ', '.join(org_context['geographic_presence'][:3])
-        
-        prompt = f"""
-        Analyze this threat indicator against our organizational context.
-        
-        Threat: {indicator_name}
-        Pattern: {pattern[:100]}
-        Description: {description[:200]}
-        
-        Our Organization:
-        Technologies: {tech_list}
-        Locations: {geo_list}
-        
-        Provide a JSON response with:
-        1. "affected_assets": List of our technologies/systems that could be targeted
-        2. "business_impact": Brief description of potential impact
-        3. "risk_score": Number 1-10 based on relevance
-        4. "reasoning": One sentence explanation
-        
-        If not relevant, return risk_score of 0.
-        
-        Respond with valid JSON only.
-        """
         
         try:
-            response = llm.invoke(prompt)
-            import json
-            assessment = json.loads(response.content)
+            prompt = self._single_prompt('indicator', indicator, system_prompt)
+            assessment = self._llm_cached(prompt, RiskAssessment).as_dict()
             
             # Add indicator details
             assessment['threat_type'] = 'indicator'
@@ -226,15 +384,21 @@ class CorrelationAgent:
         if not risk_assessments:
             return "No significant risks identified based on current threat landscape."
         
-        high_risks = [r for r in risk_assessments if r.get('risk_score', 0) >= 7]
-        medium_risks = [r for r in risk_assessments if 4 <= r.get('risk_score', 0) < 7]
+        # Only the counts are reported, so tally both bands in one pass
+        high_count = medium_count = 0
+        for risk in risk_assessments:
+            score = risk.get('risk_score', 0)
+            if score >= 7:
+                high_count += 1
+            elif score >= 4:
+                medium_count += 1
         
         summary = f"""
         RISK ASSESSMENT SUMMARY
         =======================
         Total Threats Analyzed: {len(risk_assessments)}
-        High Risk: {len(high_risks)}
-        Medium Risk: {len(medium_risks)}
+        High Risk: {high_count}
+        Medium Risk: {medium_count}
         
         TOP RISKS:
         """
@@ -1,3 +1,4 @@
+from collections import defaultdict
 from neo4j import GraphDatabase
 from langchain_community.graphs.graph_document import GraphDocument
 import os
@@ -14,8 +15,16 @@ class Neo4jConnection:
             result = session.run(query, parameters)
             return [record for record in result]
 
+    def execute_write(self, work, *args, db=None):
+        """Run work(tx, *args) inside one managed write transaction."""
+        with self._driver.session(database=db) as session:
+            return session.execute_write(work, *args)
+
 db_connection = None
 
+# Labels that already have an id index, so the schema statement runs once per label per process
+_indexed_labels = set()
+
 def get_db():
     global db_connection
     if db_connection is None:
@@ -31,32 +40,54 @@ def close_db():
         db_connection.close()
         db_connection = None
 
+def _quote(name: str) -> str:
+    """Backtick-quote a label or relationship type for interpolation into Cypher."""
+    return "`%s`" % name.replace("`", "``")
+
+def _write_graph(tx, nodes_by_label, rels_by_type):
+    for label, rows in nodes_by_label.items():
+        tx.run(
+            "UNWIND $rows AS r MERGE (n:%s {id: r.id}) SET n += r.props" % _quote(label),
+            rows=rows
+        )
+    # Endpoint labels let MATCH use the per-label id index instead of scanning every node
+    for (rel_type, from_label, to_label), rows in rels_by_type.items():
+        tx.run(
+            """
+            UNWIND $rows AS r
+            MATCH (a:%s {id: r.from}), (b:%s {id: r.to})
+            MERGE (a)-[rel:%s]->(b)
+            SET rel += r.props
+            """ % (_quote(from_label), _quote(to_label), _quote(rel_type)),
+            rows=rows
+        )
+
+def _ensure_id_indexes(db, labels):
+    """Index id on every label about to be written (schema changes cannot share the write transaction)."""
+    for label in set(labels) - _indexed_labels:
+        db.query("CREATE INDEX IF NOT EXISTS FOR (n:%s) ON (n.id)" % _quote(label))
+        _indexed_labels.add(label)
+
 def add_graph_to_db(graph_document: GraphDocument):
     """
     Writes a GraphDocument object to the Neo4j database.
     This function creates the actual nodes and relationships for the 'Organizational DNA'.
+    Nodes are grouped by label and relationships by (type, endpoint labels), so each group is
+    one UNWIND statement and the whole document is written in a single transaction.
     """
     db = get_db()
-    
-    # Create nodes
+
+    nodes_by_label = defaultdict(list)
     for node in graph_document.nodes:
-        db.query(
-            "MERGE (n:`%s` {id: $id}) SET n += $properties" % node.type,
-            parameters={'id': node.id, 'properties': node.properties}
-        )
+        nodes_by_label[node.type].append({'id': node.id, 'props': node.properties})
 
-    # Create relationships
+    rels_by_type = defaultdict(list)
     for rel in graph_document.relationships:
-        # The fix is here: we use rel.source.id and rel.target.id
-        db.query(
-            """
-            MATCH (a {id: $start_id}), (b {id: $end_id})
-            MERGE (a)-[r:`%s`]->(b)
-            SET r += $properties
-            """ % rel.type,
-            parameters={
-                'start_id': rel.source.id, # CORRECTED from rel.start.id
-                'end_id': rel.target.id,   # CORRECTED from rel.end.id
-                'properties': rel.properties
-            }
-        )
\ No newline at end of file
+        rels_by_type[(rel.type, rel.source.type, rel.target.type)].append({
+            'from': rel.source.id,
+            'to': rel.target.id,
+            'props': rel.properties
+        })
+
+    _ensure_id_indexes(db, nodes_by_label)
+    db.execute_write(_write_graph, dict(nodes_by_label), dict(rels_by_type))
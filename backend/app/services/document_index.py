@@ -0,0 +1,71 @@
+"""
+document_index.py
+SQLite record of which uploaded documents are already in the knowledge graph (cAIber Stage 1)
+"""
+
+import hashlib
+import os
+import sqlite3
+import tempfile
+import time
+from threading import Lock
+from typing import Dict, List
+
+from langchain.schema import Document
+
+DEFAULT_INDEX_PATH = os.getenv(
+    "CAIBER_DNA_INDEX", os.path.join(tempfile.gettempdir(), "caiber_dna_index.sqlite")
+)
+
+
+def hash_documents_by_file(documents: List[Document]) -> Dict[str, str]:
+    """sha1 over every chunk of each source file, keyed by file name."""
+    hashers: Dict[str, "hashlib._Hash"] = {}
+    for doc in documents:
+        file_name = doc.metadata.get("file_name", "unknown")
+        hasher = hashers.setdefault(file_name, hashlib.sha1())
+        hasher.update(doc.page_content.encode("utf-8"))
+        hasher.update(b"\0")
+    return {file_name: hasher.hexdigest() for file_name, hasher in hashers.items()}
+
+
+class DocumentIndex:
+    """
+    Set of (file name, sha1) pairs already merged into Neo4j. Keyed on content as well as
+    name, so same-named uploads from different sessions do not evict each other's record.
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        self.path = path
+        self._lock = Lock()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS indexed_files (
+                    file_name TEXT NOT NULL,
+                    sha1 TEXT NOT NULL,
+                    indexed_at REAL NOT NULL,
+                    PRIMARY KEY (file_name, sha1)
+                )
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path)
+
+    def changed_files(self, file_hashes: Dict[str, str]) -> List[str]:
+        """File names that are new or whose content hash differs from the indexed one."""
+        with self._lock, self._connect() as conn:
+            stored = set(conn.execute("SELECT file_name, sha1 FROM indexed_files"))
+        return [name for name, sha1 in file_hashes.items() if (name, sha1) not in stored]
+
+    def record(self, file_hashes: Dict[str, str]) -> None:
+        now = time.time()
+        rows = [(name, sha1, now) for name, sha1 in file_hashes.items()]
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO indexed_files (file_name, sha1, indexed_at) VALUES (?, ?, ?)",
+                rows
+            )
+
+    def clear(self) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM indexed_files")
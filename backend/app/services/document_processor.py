@@ -1,9 +1,57 @@
-from typing import List
+import hashlib
+from collections import OrderedDict
+from typing import List, Optional
 from pathlib import Path
 from langchain.document_loaders import PyPDFLoader, TextLoader, Docx2txtLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
 
+# One processor per worker process, built on first use
+_worker_processor: Optional["DocumentProcessor"] = None
+
+# Bump when loading/splitting/classification changes so cached chunks are re-parsed
+PARSER_VERSION = "1"
+
+# Parsed chunks of recently uploaded files keyed on (content digest, file name, parser version)
+PARSED_CACHE_SIZE = 64
+_parsed_cache: "OrderedDict[str, List[Document]]" = OrderedDict()
+
+
+def parsed_cache_key(content_digest: str, file_name: str) -> str:
+    # The file name is part of the key: it feeds the chunk metadata and document classification
+    return hashlib.blake2b(
+        f"{PARSER_VERSION}|{file_name}|{content_digest}".encode("utf-8"), digest_size=16
+    ).hexdigest()
+
+
+def _copy_chunks(chunks: List[Document]) -> List[Document]:
+    # Fresh Document objects so the cache and sessions never share mutable metadata
+    return [Document(page_content=c.page_content, metadata=dict(c.metadata)) for c in chunks]
+
+
+def get_cached_chunks(key: str) -> Optional[List[Document]]:
+    chunks = _parsed_cache.get(key)
+    if chunks is None:
+        return None
+    _parsed_cache.move_to_end(key)
+    return _copy_chunks(chunks)
+
+
+def cache_chunks(key: str, chunks: List[Document]) -> None:
+    """Store copies: the caller hands the originals on to a session, which may mutate them."""
+    _parsed_cache[key] = _copy_chunks(chunks)
+    _parsed_cache.move_to_end(key)
+    while len(_parsed_cache) > PARSED_CACHE_SIZE:
+        _parsed_cache.popitem(last=False)
+
+
+def load_in_worker(file_path: str, original_name: Optional[str] = None) -> List[Document]:
+    """ProcessPoolExecutor entry point: parse and chunk one file in a worker process."""
+    global _worker_processor
+    if _worker_processor is None:
+        _worker_processor = DocumentProcessor()
+    return _worker_processor._load_single_document(file_path, original_name=original_name)
+
 
 class DocumentProcessor:
     """Handles ingestion and processing of various document types."""
@@ -0,0 +1,82 @@
+"""
+feed_cache.py
+Compressed on-disk TTL cache for raw threat feed responses (cAIber Stage 2 collection)
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+import zlib
+import orjson
+from threading import Lock
+from typing import Any, Dict, Optional
+
+# Seconds a cached response stays fresh, per feed
+FEED_TTLS = {
+    "cve": 60 * 60,
+    "otx": 15 * 60,
+    "github": 6 * 60 * 60,
+}
+
+DEFAULT_CACHE_DIR = os.getenv("CAIBER_FEED_CACHE", os.path.join(tempfile.gettempdir(), "caiber_feeds"))
+
+
+class FeedCache:
+    """zlib-compressed JSON files keyed by (source, query), expired by file age."""
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, size_limit: int = 2 ** 30):
+        self.directory = directory
+        self.size_limit = size_limit
+        self._lock = Lock()
+
+    def _path(self, source: str, query: Dict[str, Any]) -> str:
+        digest = hashlib.blake2b(
+            json.dumps(query, sort_keys=True, default=str).encode("utf-8"), digest_size=16
+        ).hexdigest()
+        return os.path.join(self.directory, f"{source}-{digest}.json.z")
+
+    def get(self, source: str, query: Dict[str, Any], ttl: float) -> Optional[Any]:
+        path = self._path(source, query)
+        try:
+            if time.time() - os.path.getmtime(path) > ttl:
+                return None
+            with open(path, "rb") as fh:
+                return orjson.loads(zlib.decompress(fh.read()))
+        except (OSError, ValueError, zlib.error):
+            return None
+
+    def set(self, source: str, query: Dict[str, Any], value: Any) -> None:
+        path = self._path(source, query)
+        payload = zlib.compress(orjson.dumps(value), 6)
+        with self._lock:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as fh:
+                    fh.write(payload)
+                os.replace(tmp_path, path)
+                self._enforce_size_limit()
+            except OSError as e:
+                print(f"WARNING: Could not write feed cache entry {path}: {e}")
+
+    def _enforce_size_limit(self) -> None:
+        """Drop the oldest entries once the cache directory exceeds size_limit bytes."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json.z"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.size_limit:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+feed_cache = FeedCache()
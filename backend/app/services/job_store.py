@@ -0,0 +1,78 @@
+# services/job_store.py
+import os
+import time
+from threading import Lock
+from typing import Any, Dict, Optional
+from uuid import uuid4
+
+PIPELINE_STAGES = 4
+
+_JOBS: Dict[str, Dict[str, Any]] = {}
+_LOCK = Lock()
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+# Finished jobs (and their results) are kept this long for polling clients, then dropped
+JOB_TTL_SECONDS = int(os.getenv("CAIBER_JOB_TTL", "3600"))
+
+def _evict_expired(now: float) -> None:
+    """Drop finished jobs older than JOB_TTL_SECONDS. Caller holds _LOCK."""
+    expired = [job_id for job_id, job in _JOBS.items()
+               if job["status"] in TERMINAL_STATUSES and now - job["updated_at"] > JOB_TTL_SECONDS]
+    for job_id in expired:
+        del _JOBS[job_id]
+
+def create_job(stages: int = PIPELINE_STAGES) -> str:
+    job_id = uuid4().hex
+    with _LOCK:
+        _evict_expired(time.time())
+        _JOBS[job_id] = {
+            "job_id": job_id,
+            "status": "queued",
+            "stage": 0,
+            "stages": stages,
+            "stage_name": None,
+            "progress": 0.0,
+            "partial_result": {},
+            "result": None,
+            "error": None,
+            "created_at": time.time(),
+            "updated_at": time.time(),
+        }
+    return job_id
+
+def update_stage(job_id: str, stage: int, partial: Optional[Dict[str, Any]] = None,
+                 stage_name: Optional[str] = None) -> None:
+    with _LOCK:
+        job = _JOBS.get(job_id)
+        if job is None:
+            return
+        job["status"] = "running"
+        job["stage"] = stage
+        if stage_name:
+            job["stage_name"] = stage_name
+        job["progress"] = round(min(stage, job["stages"]) / job["stages"], 2)
+        if partial:
+            job["partial_result"].update(partial)
+        job["updated_at"] = time.time()
+
+def complete_job(job_id: str, result: Dict[str, Any]) -> None:
+    with _LOCK:
+        job = _JOBS.get(job_id)
+        if job is None:
+            return
+        job.update(status="completed", stage=job["stages"], stage_name="done", progress=1.0,
+                   result=result, updated_at=time.time())
+
+def fail_job(job_id: str, error: str) -> None:
+    with _LOCK:
+        job = _JOBS.get(job_id)
+        if job is None:
+            return
+        job.update(status="failed", error=error, updated_at=time.time())
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    with _LOCK:
+        _evict_expired(time.time())
+        job = _JOBS.get(job_id)
+        return dict(job) if job else None
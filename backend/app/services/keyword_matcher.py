@@ -0,0 +1,133 @@
+"""
+keyword_matcher.py
+Single-pass multi-keyword matching for cAIber Stage 2 feed filtering
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from threading import Lock
+from typing import Iterable, Set
+
+try:
+    import hyperscan
+except ImportError:  # optional SIMD backend - Aho-Corasick is used without it
+    hyperscan = None
+
+try:
+    import ahocorasick
+except ImportError:  # pyahocorasick not installed - fall back to a regex alternation
+    ahocorasick = None
+
+
+class KeywordMatcher:
+    """
+    Matches a set of PIR keywords against feed text in one pass.
+    Backends, fastest first: Hyperscan database, Aho-Corasick automaton, regex alternation.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = frozenset(kw.lower() for kw in keywords if kw)
+        self._hs_db = None
+        self._hs_keywords = ()
+        self._hs_local = threading.local()
+        self._automaton = None
+        self._pattern = None
+        self._prefixes = {}
+
+        if not self.keywords:
+            return
+
+        if hyperscan is not None:
+            self._hs_keywords = tuple(sorted(self.keywords))
+            self._hs_db = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+            self._hs_db.compile(
+                expressions=[re.escape(kw).encode("utf-8") for kw in self._hs_keywords],
+                ids=list(range(len(self._hs_keywords))),
+                elements=len(self._hs_keywords),
+                # Text is lowercased before scanning (CASELESS only folds ASCII)
+                flags=[hyperscan.HS_FLAG_SINGLEMATCH] * len(self._hs_keywords),
+            )
+        elif ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for idx, kw in enumerate(sorted(self.keywords)):
+                self._automaton.add_word(kw, (idx, kw))
+            self._automaton.make_automaton()
+        else:
+            # Zero-width lookahead reports the longest keyword starting at every position, overlaps
+            # included; keywords that are prefixes of it start there too (see find)
+            ordered = sorted(self.keywords, key=len, reverse=True)
+            self._pattern = re.compile("(?=(" + "|".join(re.escape(kw) for kw in ordered) + "))")
+            self._prefixes = {kw: frozenset(p for p in self.keywords if kw.startswith(p)) for kw in self.keywords}
+
+    def _hs_scan(self, text: str, stop_at_first: bool) -> Set[str]:
+        # Scratch space is per thread: agents share one matcher across collection threads
+        scratch = getattr(self._hs_local, "scratch", None)
+        if scratch is None:
+            scratch = self._hs_local.scratch = hyperscan.Scratch(self._hs_db)
+        found = set()
+
+        def on_match(match_id, start, end, flags, context):
+            found.add(self._hs_keywords[match_id])
+            return stop_at_first
+
+        try:
+            self._hs_db.scan(text.encode("utf-8"), match_event_handler=on_match, scratch=scratch)
+        except hyperscan.ScanTerminated:
+            pass
+        return found
+
+    def matches(self, text: str) -> bool:
+        """Return True if any keyword occurs in text."""
+        if not text:
+            return False
+        text = text.lower()
+        if self._hs_db is not None:
+            return bool(self._hs_scan(text, stop_at_first=True))
+        if self._automaton is not None:
+            return next(self._automaton.iter(text), None) is not None
+        if self._pattern is not None:
+            return self._pattern.search(text) is not None
+        return False
+
+    def matches_any(self, texts: Iterable[str]) -> bool:
+        """matches() over several fields without joining them; stops at the first matching field."""
+        return any(self.matches(text) for text in texts)
+
+    def find(self, text: str) -> Set[str]:
+        """Return every keyword that occurs in text."""
+        if not text:
+            return set()
+        text = text.lower()
+        if self._hs_db is not None:
+            return self._hs_scan(text, stop_at_first=False)
+        if self._automaton is not None:
+            return {kw for _, (_, kw) in self._automaton.iter(text)}
+        found = set()
+        if self._pattern is not None:
+            for match in self._pattern.finditer(text):
+                found |= self._prefixes[match.group(1)]
+        return found
+
+
+# Compiled matchers keyed by keyword set, reused across requests until the keywords change
+MATCHER_CACHE_SIZE = 32
+_MATCHERS: "OrderedDict[frozenset, KeywordMatcher]" = OrderedDict()
+_MATCHERS_LOCK = Lock()
+
+
+def get_matcher(keywords: Iterable[str]) -> KeywordMatcher:
+    """Return a cached KeywordMatcher for this keyword set, compiling it only on first use."""
+    key = frozenset(kw.lower() for kw in keywords if kw)
+    with _MATCHERS_LOCK:
+        matcher = _MATCHERS.get(key)
+        if matcher is not None:
+            _MATCHERS.move_to_end(key)
+            return matcher
+    matcher = KeywordMatcher(key)
+    with _MATCHERS_LOCK:
+        matcher = _MATCHERS.setdefault(key, matcher)
+        _MATCHERS.move_to_end(key)
+        while len(_MATCHERS) > MATCHER_CACHE_SIZE:
+            _MATCHERS.popitem(last=False)
+    return matcher
@@ -7,6 +7,9 @@ import os
 from typing import List, Dict, Any
 from neo4j import GraphDatabase
 
+# Entities merged per UNWIND statement
+ENTITY_BATCH_SIZE = 1000
+
 
 class KnowledgeGraphBuilder:
     """Builds and manages the Neo4j knowledge graph."""
@@ -43,29 +46,32 @@ class KnowledgeGraphBuilder:
                 print("🗑️  Clearing existing graph data...")
                 session.run("MATCH (n) DETACH DELETE n")
             
-            # Create entity nodes
+            # Create entity nodes, one UNWIND round-trip per batch
             print("📝 Creating entity nodes...")
-            for i, entity in enumerate(entities):
-                if i % 50 == 0:  # Progress indicator
-                    print(f"   Created {i}/{len(entities)} entities...")
-                
+            for start in range(0, len(entities), ENTITY_BATCH_SIZE):
+                batch = [
+                    {
+                        "id": entity['id'],
+                        "name": entity['name'],
+                        "type": entity['type'],
+                        "source_document": entity['source_document'],
+                        "document_type": entity['document_type'],
+                        "confidence": entity['confidence'],
+                        "importance": entity.get('importance', 5),
+                    }
+                    for entity in entities[start:start + ENTITY_BATCH_SIZE]
+                ]
                 session.run("""
-                    MERGE (e:Entity {id: $id})
-                    SET e.name = $name,
-                        e.type = $type,
-                        e.source_document = $source_document,
-                        e.document_type = $document_type,
-                        e.confidence = $confidence,
-                        e.importance = $importance
-                """, 
-                id=entity['id'],
-                name=entity['name'],
-                type=entity['type'],
-                source_document=entity['source_document'],
-                document_type=entity['document_type'],
-                confidence=entity['confidence'],
-                importance=entity.get('importance', 5)
-                )
+                    UNWIND $entities AS entity
+                    MERGE (e:Entity {id: entity.id})
+                    SET e.name = entity.name,
+                        e.type = entity.type,
+                        e.source_document = entity.source_document,
+                        e.document_type = entity.document_type,
+                        e.confidence = entity.confidence,
+                        e.importance = entity.importance
+                """, entities=batch)
+                print(f"   Created {min(start + ENTITY_BATCH_SIZE, len(entities))}/{len(entities)} entities...")
             
             print(f"✅ Created {len(entities)} entity nodes")
             
@@ -0,0 +1,96 @@
+"""
+landscape_store.py
+Columnar (Arrow/Parquet) export of a cAIber threat landscape for downstream analytics
+"""
+
+import os
+import tempfile
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional - landscapes stay as dicts without it
+    pa = None
+    pq = None
+
+DEFAULT_PARQUET_PATH = os.path.join(tempfile.gettempdir(), "landscape.parquet")
+
+LANDSCAPE_SCHEMA = pa.schema([
+    ("source", pa.string()),
+    ("type", pa.string()),
+    ("value", pa.string()),
+    ("cve_id", pa.string()),
+    ("confidence", pa.int8()),
+    ("first_seen", pa.timestamp("ms")),
+    ("tags", pa.list_(pa.string())),
+]) if pa is not None else None
+
+
+def parquet_available() -> bool:
+    return pa is not None
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+def _confidence(item: Dict[str, Any]) -> Optional[int]:
+    """STIX confidence (0-100) when present, else CVSS scaled to 0-100."""
+    if item.get("confidence") is not None:
+        return int(item["confidence"])
+    if item.get("x_cvss_score") is not None:
+        return int(round(float(item["x_cvss_score"]) * 10))
+    return None
+
+
+def landscape_to_columns(threat_landscape: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """Flatten indicator and vulnerability dicts into one column per schema field."""
+    columns: Dict[str, List[Any]] = {name: [] for name in LANDSCAPE_SCHEMA.names}
+
+    for item in threat_landscape.get("vulnerabilities", []):
+        refs = item.get("external_references") or [{}]
+        name = item.get("name", "")
+        columns["source"].append(refs[0].get("source_name", ""))
+        columns["type"].append("vulnerability")
+        columns["value"].append(name)
+        columns["cve_id"].append(name if name.upper().startswith("CVE-") else None)
+        columns["confidence"].append(_confidence(item))
+        columns["first_seen"].append(_parse_timestamp(item.get("published_at") or item.get("created")))
+        columns["tags"].append(list(item.get("x_affected_packages") or []))
+
+    for item in threat_landscape.get("indicators", []):
+        value = item.get("indicator", "")
+        columns["source"].append(item.get("pulse", ""))
+        columns["type"].append(item.get("type", ""))
+        columns["value"].append(value)
+        columns["cve_id"].append(value if value.upper().startswith("CVE-") else None)
+        columns["confidence"].append(_confidence(item))
+        columns["first_seen"].append(_parse_timestamp(item.get("created")))
+        columns["tags"].append(list(item.get("x_pulses") or []))
+
+    return columns
+
+
+def write_landscape_parquet(threat_landscape: Dict[str, Any], path: str = DEFAULT_PARQUET_PATH) -> Optional[str]:
+    """Write the landscape as a Parquet table; returns the path, or None without pyarrow."""
+    if pa is None:
+        print("WARNING: pyarrow not installed - skipping Parquet landscape export")
+        return None
+    table = pa.Table.from_pydict(landscape_to_columns(threat_landscape), schema=LANDSCAPE_SCHEMA)
+    pq.write_table(table, path)
+    print(f"INFO: Wrote {table.num_rows} threats to {path}")
+    return path
+
+
+def read_landscape_table(path: str = DEFAULT_PARQUET_PATH, columns: Optional[List[str]] = None):
+    """Load an exported landscape as an Arrow table (optionally only some columns)."""
+    if pq is None:
+        raise RuntimeError("pyarrow is required to read Parquet landscapes")
+    return pq.read_table(path, columns=columns)
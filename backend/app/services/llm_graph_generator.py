@@ -1,4 +1,8 @@
 import os
+import hashlib
+import json
+import tempfile
+from functools import wraps
 from langchain_core.documents import Document
 from langchain_community.graphs.graph_document import GraphDocument
 from langchain_experimental.graph_transformers import LLMGraphTransformer
@@ -6,15 +10,69 @@ from langchain_openai import ChatOpenAI
 from dotenv import load_dotenv
 from neo4j import GraphDatabase
 import asyncio
+try:
+    from .feed_cache import FeedCache
+except ImportError:
+    from feed_cache import FeedCache
 
 load_dotenv()
 
+MODEL_ID = "gpt-4o"
+# Bump when the extraction prompt/transformer config changes so stale graphs are not reused
+EXTRACTION_PROMPT_VERSION = "1"
+EXTRACTION_CACHE_TTL = 7 * 24 * 60 * 60
+
 # Initialize the LLM, using gpt-4o as inspired by the reference project
-llm = ChatOpenAI(temperature=0, model_name="gpt-4o")
+llm = ChatOpenAI(temperature=0, model_name=MODEL_ID)
 
 # Initialize the Graph Transformer
 graph_transformer = LLMGraphTransformer(llm=llm)
 
+# Extracted GraphDocuments keyed by content hash, so re-uploaded text skips the LLM.
+# Only exact matches (after whitespace normalization) are reused: near-duplicates can differ in
+# exactly the facts the graph records
+_extraction_cache = FeedCache(
+    directory=os.getenv("CAIBER_GRAPH_CACHE", os.path.join(tempfile.gettempdir(), "caiber_graphs"))
+)
+_extraction_stats = {"hits": 0, "misses": 0}
+
+
+def extraction_cache_key(text: str) -> dict:
+    """Cache key namespaced by model and prompt version, so bumping either invalidates old graphs."""
+    normalized = " ".join(text.split())
+    return {
+        "model": MODEL_ID,
+        "prompt_version": EXTRACTION_PROMPT_VERSION,
+        "content": hashlib.sha256(normalized.encode("utf-8")).hexdigest(),
+    }
+
+
+def extraction_cache_stats() -> dict:
+    lookups = _extraction_stats["hits"] + _extraction_stats["misses"]
+    return {
+        **_extraction_stats,
+        "hit_rate": round(_extraction_stats["hits"] / lookups, 3) if lookups else 0.0,
+    }
+
+
+def cached_extraction(func):
+    """Return the stored GraphDocument for previously seen text instead of calling the LLM again."""
+    @wraps(func)
+    async def wrapper(text: str) -> GraphDocument:
+        key = extraction_cache_key(text)
+        cached = _extraction_cache.get("graph", key, EXTRACTION_CACHE_TTL)
+        if cached is not None:
+            _extraction_stats["hits"] += 1
+            return GraphDocument.model_validate(cached)
+
+        _extraction_stats["misses"] += 1
+        graph_doc = await func(text)
+        if graph_doc is not None:
+            _extraction_cache.set("graph", key, json.loads(graph_doc.model_dump_json()))
+        return graph_doc
+    return wrapper
+
+@cached_extraction
 async def extract_graph_from_text(text: str) -> GraphDocument:
     """
     Asynchronously extracts graph data from unstructured text using the LLMGraphTransformer.
@@ -35,20 +93,6 @@ async def extract_graph_from_text(text: str) -> GraphDocument:
     # Return the first graph document, if it exists
     return graph_documents[0] if graph_documents else None
 
-file_path = "/Users/vihaanmotwani/Documents/cAIber/documents/technical_architecture_v2.txt"
-try:
-    with open(file_path, "r") as file:
-        content = file.read()
-except FileNotFoundError:
-    print(f"Error: The file '{file_path}' was not found.")
-except Exception as e:
-    print(f"An error occurred: {e}")
-
-graph_doc = asyncio.run(extract_graph_from_text(content))
-
-driver = GraphDatabase.driver(os.getenv("NEO4J_URI"), auth=("neo4j", os.getenv("NEO4J_PASSWORD")))
-
-import json
 
 def safe_props(props):
     """Convert any property dict into Neo4j-safe primitives."""
@@ -100,4 +144,18 @@ def ingest_graph_document(graph_doc: GraphDocument):
 
 
 
-ingest_graph_document(graph_doc)
\ No newline at end of file
+if __name__ == "__main__":
+    file_path = "/Users/vihaanmotwani/Documents/cAIber/documents/technical_architecture_v2.txt"
+    try:
+        with open(file_path, "r") as file:
+            content = file.read()
+    except FileNotFoundError:
+        print(f"Error: The file '{file_path}' was not found.")
+    except Exception as e:
+        print(f"An error occurred: {e}")
+
+    graph_doc = asyncio.run(extract_graph_from_text(content))
+
+    driver = GraphDatabase.driver(os.getenv("NEO4J_URI"), auth=("neo4j", os.getenv("NEO4J_PASSWORD")))
+
+    ingest_graph_document(graph_doc)
\ No newline at end of file
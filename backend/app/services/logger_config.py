@@ -2,18 +2,36 @@
 Simple logging configuration for cAIber
 """
 
+import atexit
 import logging
+import queue
 import sys
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+
+# Listener per logger name, so re-running setup_logger replaces rather than stacks threads
+_listeners = {}
+
+
+@atexit.register
+def _stop_listeners():
+    """Flush and stop the live listeners once at exit (replaced ones were already stopped)."""
+    for listener in _listeners.values():
+        listener.stop()
+    _listeners.clear()
 
 def setup_logger(name="cAIber", level=logging.INFO):
-    """Set up a simple logger with console and file output"""
+    """Set up a simple logger with console and file output.
+    Callers only enqueue records; formatting and the stdout/file writes happen on a
+    background listener thread so request handlers never block on log I/O."""
     
     logger = logging.getLogger(name)
     logger.setLevel(level)
     
     # Clear existing handlers
     logger.handlers = []
+    if name in _listeners:
+        _listeners.pop(name).stop()
     
     # Console handler - only important messages
     console = logging.StreamHandler(sys.stdout)
@@ -28,8 +46,12 @@ def setup_logger(name="cAIber", level=logging.INFO):
     file_format = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     file_handler.setFormatter(file_format)
     
-    logger.addHandler(console)
-    logger.addHandler(file_handler)
+    log_queue = queue.Queue(-1)
+    listener = QueueListener(log_queue, console, file_handler, respect_handler_level=True)
+    listener.start()
+    _listeners[name] = listener
+    
+    logger.addHandler(QueueHandler(log_queue))
     
     return logger
 
@@ -7,6 +7,8 @@ from typing import Dict, Any, List
 from langchain.schema import Document
 from .entity_extractor import EntityExtractor
 from .knowledge_graph_builder import KnowledgeGraphBuilder
+from .pir_generator_main import EMPTY_GRAPH_FINGERPRINT, graph_fingerprint
+from .document_index import DocumentIndex, hash_documents_by_file
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -22,6 +24,7 @@ class OrganizationalDNAEngine:
         print("=" * 50)
         self.entity_extractor = EntityExtractor()
         self.graph_builder = KnowledgeGraphBuilder(neo4j_uri, neo4j_user, neo4j_password)
+        self.document_index = DocumentIndex()
 
     def build_organizational_dna(
         self,
@@ -35,6 +38,19 @@ class OrganizationalDNAEngine:
 
         print(f"✅ Received {len(documents)} document chunks")
 
+        # Skip the rebuild when every file is already in the graph unchanged. Otherwise rebuild from
+        # all documents: relationships span files, and nodes are not tracked per source file.
+        file_hashes = hash_documents_by_file(documents)
+        if clear_existing or graph_fingerprint(self.graph_builder.driver) in (None, EMPTY_GRAPH_FINGERPRINT):
+            self.document_index.clear()
+        changed = self.document_index.changed_files(file_hashes)
+        if not changed:
+            print("♻️  All documents already indexed in the knowledge graph - skipping rebuild")
+            return
+        print(f"📑 {len(changed)}/{len(file_hashes)} files new or changed since last build - rebuilding")
+        clear_existing = True
+        self.document_index.clear()
+
         # breakdown
         doc_types: Dict[str, int] = {}
         for d in documents:
@@ -85,6 +101,8 @@ class OrganizationalDNAEngine:
         # Step 3: Build knowledge graph
         print("\n🕸️  Step 3: Building knowledge graph...")
         self.graph_builder.build_knowledge_graph(entities, clear_existing, relationships)
+
+        self.document_index.record(file_hashes)
         
         print("\n✅ Organizational DNA Build Complete!")
 
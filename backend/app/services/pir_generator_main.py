@@ -4,14 +4,141 @@ cAIber Stage 2 - Priority Intelligence Requirements Generation
 """
 
 import os
-from typing import Dict, Any
+import json
+import hashlib
+import tempfile
+from typing import Dict, Any, List, Optional
 from langchain_openai import ChatOpenAI
 from langchain_neo4j import GraphCypherQAChain
 from langchain_neo4j import Neo4jGraph
 from neo4j import GraphDatabase
 from dotenv import load_dotenv
+try:
+    from .feed_cache import FeedCache
+except ImportError:
+    from feed_cache import FeedCache
 load_dotenv()
 
+# Memoized PIR payloads keyed on (uploaded documents, graph fingerprint), kept on disk across restarts
+PIR_CACHE_TTL = 7 * 24 * 60 * 60
+_pir_cache = FeedCache(
+    directory=os.getenv("CAIBER_PIR_CACHE", os.path.join(tempfile.gettempdir(), "caiber_pirs")),
+    size_limit=64 * 2 ** 20,
+)
+
+
+def documents_fingerprint(documents: List[Any]) -> str:
+    """Hash the uploaded document chunks so unchanged uploads map to the same key."""
+    digest = hashlib.blake2b(digest_size=16)
+    for doc in documents:
+        digest.update(doc.metadata.get("file_name", "").encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(doc.page_content.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+GRAPH_FINGERPRINT_QUERY = """
+    MATCH (n:Entity)
+    RETURN n.name AS name, n.type AS type, [(n)-[r]->(m:Entity) | type(r) + '>' + m.name] AS rels
+"""
+
+
+def _graph_digest(records) -> str:
+    """Order-independent hash over entity names and types and the relationships between them."""
+    digest = hashlib.blake2b(digest_size=16)
+    rows = sorted("\0".join([str(r['name']), str(r['type']), *sorted(map(str, r['rels']))]) for r in records)
+    for row in rows:
+        digest.update(row.encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+# Fingerprint of a graph with no entities
+EMPTY_GRAPH_FINGERPRINT = _graph_digest([])
+
+
+def graph_fingerprint(driver) -> Optional[str]:
+    """Fingerprint of the org-DNA graph contents, so same-sized edits still change it."""
+    if driver is None:
+        return None
+    try:
+        records, _, _ = driver.execute_query(GRAPH_FINGERPRINT_QUERY)
+        return _graph_digest(records)
+    except Exception as e:
+        print(f"⚠️  Could not fingerprint knowledge graph: {e}")
+        return None
+
+
+async def graph_fingerprint_async(driver) -> Optional[str]:
+    """graph_fingerprint for an AsyncDriver."""
+    if driver is None:
+        return None
+    try:
+        records, _, _ = await driver.execute_query(GRAPH_FINGERPRINT_QUERY)
+        return _graph_digest(records)
+    except Exception as e:
+        print(f"⚠️  Could not fingerprint knowledge graph: {e}")
+        return None
+
+
+def pir_cache_key(documents_key: str, graph_key: Optional[str]) -> Optional[str]:
+    if graph_key is None:
+        return None
+    return hashlib.blake2b(f"{documents_key}|{graph_key}".encode("utf-8"), digest_size=16).hexdigest()
+
+
+def get_cached_pirs(key: Optional[str]) -> Optional[Dict[str, Any]]:
+    if key is None:
+        return None
+    cached = _pir_cache.get("pirs", {"key": key}, PIR_CACHE_TTL)
+    return dict(cached, cached=True) if cached is not None else None
+
+
+def cache_pirs(key: Optional[str], result: Dict[str, Any]) -> None:
+    if key is None:
+        return
+    _pir_cache.set("pirs", {"key": key}, result)
+
+
+# Static fallback payload used when Neo4j is unavailable (built once, not per request)
+MOCK_PIRS = """
+Priority Intelligence Requirements (PIRs) - TechCorp Inc.
+
+PIR-001: Cloud Infrastructure Threats
+- Monitor for vulnerabilities in AWS, Azure, and multi-cloud environments
+- Track containerization threats targeting Kubernetes and Docker deployments
+- Assess supply chain attacks affecting cloud service providers
+
+PIR-002: Critical Asset Protection
+- Intelligence on threats targeting customer databases and payment systems
+- Monitor for credential stuffing and account takeover campaigns
+- Track insider threats and privileged access abuse
+
+PIR-003: Compliance and Regulatory Threats
+- GDPR compliance threats and data privacy violations
+- PCI-DSS related attack vectors targeting payment processing
+- Monitor for regulatory changes affecting cybersecurity requirements
+
+PIR-004: Emerging Threat Landscape
+- Advanced persistent threat (APT) groups targeting financial services
+- Ransomware campaigns using double extortion tactics
+- Zero-day vulnerabilities in enterprise software stack
+
+PIR-005: Geographic and Sector-Specific Intelligence
+- Cyber threats originating from high-risk geographic regions
+- Industry-specific attack patterns in fintech and e-commerce
+- Nation-state sponsored activities targeting critical infrastructure
+        """
+
+MOCK_KEYWORDS = {
+    "technologies": ["aws", "azure", "kubernetes", "docker", "postgresql"],
+    "threats": ["ransomware", "apt", "supply-chain", "insider-threat"],
+    "geographies": ["europe", "us-east", "asia-pacific"],
+    "business_initiatives": ["fintech", "e-commerce", "cloud-migration"]
+}
+
+
 class PIRGenerator:
     """Generates Priority Intelligence Requirements from organizational knowledge graph."""
     
@@ -122,6 +249,21 @@ class PIRGenerator:
 
         Now, analyze the provided graph data and generate the PIRs.
         """
+
+        self.PIR_OUTPUT_FORMAT = """
+        Return the result strictly as one JSON object, with the PIRs and the most important
+        keywords from them (categorized under technologies, geographies, business_initiatives
+        and threat_actors):
+        {
+            "pirs": "The full PIR text",
+            "keywords": {
+                "technologies": ["AWS", "Azure", "Kubernetes"],
+                "geographies": ["Southeast Asia"],
+                "business_initiatives": ["Cloud Expansion"],
+                "threat_actors": ["APT29"]
+            }
+        }
+        """
     
     def validate_graph_data(self) -> bool:
         """Validate that the knowledge graph contains data for PIR generation."""
@@ -197,12 +339,16 @@ class PIRGenerator:
             
             print("\n🧠 Analyzing organizational context and generating PIRs...")
             context = self.get_context_summary()
-            result = self.llm.invoke(f"{self.PIR_GENERATION_PROMPT}\n\nContext:\n{context}")
-
-            pir_text = result.content if hasattr(result, "content") else str(result)
+            # PIRs and their keywords come back from a single LLM call
+            result = self.llm.invoke(
+                f"{self.PIR_GENERATION_PROMPT}\n\nContext:\n{context}\n\n{self.PIR_OUTPUT_FORMAT}"
+            )
+            content = result.content if hasattr(result, "content") else str(result)
+            pir_text, keywords = self._parse_pir_response(content)
 
-            # Extract keywords via LLM
-            keywords = self.extract_keywords(pir_text)
+            # Only spend a second call on keywords if the combined response was not usable JSON
+            if keywords is None:
+                keywords = self.extract_keywords(pir_text)
             
             print("\n✅ PIR Generation Successful!")
             
@@ -221,48 +367,26 @@ class PIRGenerator:
                 "timestamp": __import__('datetime').datetime.now().isoformat()
             }
     
+    def _parse_pir_response(self, content: str):
+        """Split the combined JSON response into (pir_text, keywords); keywords is None if unparseable."""
+        try:
+            parsed = json.loads(content[content.index('{'):content.rindex('}') + 1])
+            pirs = parsed.get("pirs")
+            keywords = parsed.get("keywords")
+            if isinstance(pirs, list):
+                pirs = "\n\n".join(str(p) for p in pirs)
+            if pirs and isinstance(keywords, dict):
+                return pirs, keywords
+        except (ValueError, AttributeError):
+            pass
+        return content, None
+
     def get_mock_pirs(self) -> Dict[str, Any]:
         """Return mock PIRs when Neo4j is not available."""
-        mock_pirs = """
-Priority Intelligence Requirements (PIRs) - TechCorp Inc.
-
-PIR-001: Cloud Infrastructure Threats
-- Monitor for vulnerabilities in AWS, Azure, and multi-cloud environments
-- Track containerization threats targeting Kubernetes and Docker deployments
-- Assess supply chain attacks affecting cloud service providers
-
-PIR-002: Critical Asset Protection
-- Intelligence on threats targeting customer databases and payment systems
-- Monitor for credential stuffing and account takeover campaigns
-- Track insider threats and privileged access abuse
-
-PIR-003: Compliance and Regulatory Threats
-- GDPR compliance threats and data privacy violations
-- PCI-DSS related attack vectors targeting payment processing
-- Monitor for regulatory changes affecting cybersecurity requirements
-
-PIR-004: Emerging Threat Landscape
-- Advanced persistent threat (APT) groups targeting financial services
-- Ransomware campaigns using double extortion tactics
-- Zero-day vulnerabilities in enterprise software stack
-
-PIR-005: Geographic and Sector-Specific Intelligence
-- Cyber threats originating from high-risk geographic regions
-- Industry-specific attack patterns in fintech and e-commerce
-- Nation-state sponsored activities targeting critical infrastructure
-        """
-        
-        keywords = {
-            "technologies": ["aws", "azure", "kubernetes", "docker", "postgresql"],
-            "threats": ["ransomware", "apt", "supply-chain", "insider-threat"],
-            "geographies": ["europe", "us-east", "asia-pacific"],
-            "business_initiatives": ["fintech", "e-commerce", "cloud-migration"]
-        }
-        
         return {
             "success": True,
-            "pirs": mock_pirs,
-            "keywords": keywords,
+            "pirs": MOCK_PIRS,
+            "keywords": {category: list(terms) for category, terms in MOCK_KEYWORDS.items()},
             "timestamp": __import__('datetime').datetime.now().isoformat(),
             "mock_data": True
         }
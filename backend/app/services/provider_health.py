@@ -0,0 +1,95 @@
+"""
+provider_health.py
+Rolling latency / error tracking per threat feed, used to skip degraded providers during collection
+"""
+
+import os
+import time
+from collections import deque
+from threading import Lock
+from typing import Deque, Dict, List, Tuple
+
+HEALTH_WINDOW_SECONDS = 5 * 60
+MAX_ERROR_RATE = 0.5
+LATENCY_SLA_SECONDS = float(os.getenv("CAIBER_PROVIDER_SLA_SECONDS", "30"))
+MIN_SAMPLES = 2
+EWMA_ALPHA = 0.3
+
+
+class ProviderStats:
+    """Samples from the last HEALTH_WINDOW_SECONDS, EWMA error rate/latency and lifetime counters for reporting."""
+
+    def __init__(self):
+        self.samples: Deque[Tuple[float, float, bool]] = deque()
+        self.ewma_error_rate = 0.0
+        self.ewma_latency = 0.0
+        self.total_calls = 0
+        self.total_errors = 0
+        self.total_latency = 0.0
+
+    def record(self, latency: float, ok: bool) -> None:
+        now = time.monotonic()
+        self.samples.append((now, latency, ok))
+        self.total_calls += 1
+        self.total_errors += 0 if ok else 1
+        self.total_latency += latency
+        self.ewma_error_rate = EWMA_ALPHA * (0.0 if ok else 1.0) + (1 - EWMA_ALPHA) * self.ewma_error_rate
+        self.ewma_latency = EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.ewma_latency
+        self._expire(now)
+
+    def _expire(self, now: float) -> None:
+        while self.samples and now - self.samples[0][0] > HEALTH_WINDOW_SECONDS:
+            self.samples.popleft()
+
+    def window_stats(self) -> Tuple[int, float, float]:
+        """(sample count, error rate, p95 latency) over the recent window."""
+        self._expire(time.monotonic())
+        if not self.samples:
+            return 0, 0.0, 0.0
+        latencies = sorted(latency for _, latency, _ in self.samples)
+        errors = sum(1 for _, _, ok in self.samples if not ok)
+        p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+        return len(self.samples), errors / len(self.samples), p95
+
+
+_PROVIDERS: Dict[str, ProviderStats] = {}
+_LOCK = Lock()
+
+
+def record(provider: str, latency: float, ok: bool) -> None:
+    with _LOCK:
+        _PROVIDERS.setdefault(provider, ProviderStats()).record(latency, ok)
+
+
+def is_healthy(provider: str) -> bool:
+    """Unhealthy only with enough recent samples showing >50% errors or p95 latency over the SLA."""
+    with _LOCK:
+        stats = _PROVIDERS.get(provider)
+        if stats is None:
+            return True
+        count, error_rate, p95 = stats.window_stats()
+    if count < MIN_SAMPLES:
+        return True
+    return error_rate <= MAX_ERROR_RATE and p95 <= LATENCY_SLA_SECONDS
+
+
+def degraded(providers: List[str]) -> List[str]:
+    return [p for p in providers if not is_healthy(p)]
+
+
+def snapshot() -> Dict[str, Dict[str, float]]:
+    with _LOCK:
+        result = {}
+        for name, stats in _PROVIDERS.items():
+            count, error_rate, p95 = stats.window_stats()
+            result[name] = {
+                "samples": count,
+                "error_rate": round(error_rate, 3),
+                "p95_latency": round(p95, 3),
+                "ewma_error_rate": round(stats.ewma_error_rate, 3),
+                "ewma_latency": round(stats.ewma_latency, 3),
+                "total_calls": stats.total_calls,
+                "total_errors": stats.total_errors,
+                "total_latency": round(stats.total_latency, 3),
+            }
+        return result
@@ -1,5 +1,6 @@
 # services/session_store.py
-from typing import Dict, List
+from itertools import chain
+from typing import Dict, Iterable, List
 from uuid import uuid4
 from langchain.schema import Document
 
@@ -15,6 +16,13 @@ def add_docs(session_id: str, docs: List[Document]) -> None:
         _SESSIONS[session_id] = []
     _SESSIONS[session_id].extend(docs)
 
+def add_docs_batch(session_id: str, doc_lists: Iterable[List[Document]]) -> int:
+    """Append several files' chunks in one session update; returns how many were added."""
+    docs = _SESSIONS.setdefault(session_id, [])
+    before = len(docs)
+    docs.extend(chain.from_iterable(doc_lists))
+    return len(docs) - before
+
 def get_docs(session_id: str) -> List[Document]:
     return _SESSIONS.get(session_id, [])
 
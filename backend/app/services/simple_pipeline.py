@@ -4,6 +4,9 @@ Simple direct pipeline - minimal changes to connect stages
 
 import os
 import time
+import hashlib
+import orjson
+from typing import Dict, Tuple
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -15,32 +18,63 @@ from .threat_modeling import generate_threat_model
 from langchain_openai import ChatOpenAI
 from .logger_config import logger
 
-llm = ChatOpenAI(temperature=0, model_name="gpt-4o")
+# Keyword extraction is simple structured output, so it runs on a smaller, faster model
+KEYWORD_EXTRACTION_MODEL = os.getenv("CAIBER_KEYWORD_MODEL", "gpt-4o-mini")
+llm = ChatOpenAI(
+    temperature=0,
+    model_name=KEYWORD_EXTRACTION_MODEL,
+    model_kwargs={"response_format": {"type": "json_object"}}
+)
+
+# Keywords extracted per PIR text: {sha256(pirs_text): (expires_at, keywords)}
+KEYWORD_CACHE_TTL = 600  # seconds
+_keyword_cache: Dict[str, Tuple[float, frozenset]] = {}
 
 def extract_keywords_from_pirs(pirs_text):
-    """Extract keywords from PIRs using LLM"""
+    """Extract keywords from PIRs using LLM (memoized for KEYWORD_CACHE_TTL per PIR text)"""
     if not pirs_text:
         return {"threat", "vulnerability", "malware"}
     
+    key = hashlib.sha256(f"{KEYWORD_EXTRACTION_MODEL}\0{pirs_text}".encode("utf-8")).hexdigest()
+    cached = _keyword_cache.get(key)
+    if cached and cached[0] > time.monotonic():
+        logger.debug("Reusing keywords extracted from identical PIRs")
+        return set(cached[1])
+    
     prompt = f"""
     From the following threat intelligence requirements, extract a list of no more than 10 critical, specific, and searchable keywords.
     Focus on technologies, threat actor types, regions, and targeted assets.
-    Return the keywords as a single, comma-separated string.
+    Return a JSON object of the form {{"keywords": ["keyword", ...]}}.
 
     Requirements:
     "{pirs_text}"
-
-    Keywords:
     """
     response = llm.invoke(prompt)
-    keywords_str = response.content
-    keywords = {kw.strip().lower() for kw in keywords_str.split(',')}
+    try:
+        payload = orjson.loads(response.content)
+    except orjson.JSONDecodeError:
+        # Not JSON at all: treat the reply as a comma-separated list
+        payload = response.content.split(',')
+    # {"keywords": [...]} as requested, or a bare JSON list; any other JSON shape yields no keywords
+    extracted = payload.get("keywords", []) if isinstance(payload, dict) else payload
+    if not isinstance(extracted, list):
+        extracted = []
+    keywords = {str(kw).strip().lower() for kw in extracted if str(kw).strip()}
     print(f"Extracted keywords: {keywords}")
+    # Drop expired entries so the cache stays bounded by the PIRs seen within the TTL
+    now = time.monotonic()
+    for stale in [k for k, (expires_at, _) in _keyword_cache.items() if expires_at <= now]:
+        del _keyword_cache[stale]
+    _keyword_cache[key] = (now + KEYWORD_CACHE_TTL, frozenset(keywords))
     return keywords
 
-def run_pipeline(skip_stage1=False, autonomous_correlation=False):
-    """Run complete pipeline with direct data passing"""
+def run_pipeline(skip_stage1=False, autonomous_correlation=False, on_stage=None):
+    """Run complete pipeline with direct data passing.
+
+    on_stage, if given, is called as on_stage(stage_number, partial_result) after each stage.
+    """
     start_time = time.time()
+    report = on_stage or (lambda stage, partial=None: None)
     logger.info("Starting cAIber pipeline execution")
     
     try:
@@ -58,6 +92,7 @@ def run_pipeline(skip_stage1=False, autonomous_correlation=False):
             logger.info(f"DNA building completed in {time.time() - stage1_start:.2f}s")
         else:
             logger.info("Skipping DNA building (using existing)")
+        report(1)
         
         # Generate PIRs from knowledge graph
         logger.info("Generating PIRs")
@@ -69,6 +104,7 @@ def run_pipeline(skip_stage1=False, autonomous_correlation=False):
         # Extract keywords from PIRs
         keywords = extract_keywords_from_pirs(pirs_text)
         logger.debug(f"Keywords extracted: {keywords}")
+        report(1, {"pirs": pirs_text, "keywords": sorted(keywords)})
         
         # Stage 2: Collect Threats using keywords
         logger.info("STAGE 2: Collecting threats")
@@ -95,6 +131,7 @@ def run_pipeline(skip_stage1=False, autonomous_correlation=False):
         
         logger.info(f"Stage 2 completed in {time.time() - stage2_start:.2f}s")
         logger.info(f"Threats collected: {threat_landscape['total_items']} (CVEs: {len(threat_landscape.get('vulnerabilities', []))}, Indicators: {len(threat_landscape.get('indicators', []))})")
+        report(2, {"threat_landscape": threat_landscape})
         
         # Stage 3: Risk Correlation
         logger.info(f"STAGE 3: Risk Correlation (Mode: {'Autonomous' if autonomous_correlation else 'Standard'})")
@@ -124,6 +161,7 @@ def run_pipeline(skip_stage1=False, autonomous_correlation=False):
         
         logger.info(f"Stage 3 completed in {time.time() - stage3_start:.2f}s")
         logger.info(f"Generated {len(risk_assessments)} risk assessments")
+        report(3, {"risk_assessments": risk_assessments, "executive_summary": executive_summary})
         
         total_time = time.time() - start_time
         logger.info(f"Pipeline completed successfully in {total_time:.2f}s")
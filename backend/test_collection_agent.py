@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Collection agent tests: IOC type sniffing, OTX STIX mapping and landscape de-duplication
+(no network calls)
+"""
+
+import asyncio
+
+from app.services.collection_agent import (
+    BaseAgent, OTXAgent, ThreatLandscapeBuilder, normalize_landscape, sniff_ioc_type, threat_key
+)
+
+
+def indicator(value, pulse, ioc_type="IPv4"):
+    return {"type": ioc_type, "indicator": value, "pattern": f"[ipv4-addr:value = '{value}']", "pulse": pulse}
+
+
+def vulnerability(name, cvss=None, severity="UNKNOWN", refs=()):
+    return {
+        "type": "vulnerability",
+        "name": name,
+        "x_cvss_score": cvss,
+        "x_severity": severity,
+        "external_references": [{"source_name": source} for source in refs],
+    }
+
+
+def test_sniff_ioc_type():
+    cases = {
+        "203.0.113.7": "ipv4",
+        "  203.0.113.7  ": "ipv4",
+        "2001:db8::1": "ipv6",
+        "::1": "ipv6",
+        "evil.example.com": "domain",
+        "http://evil.example.com/payload": "url",
+        "CVE-2024-21234": "cve",
+        "d41d8cd98f00b204e9800998ecf8427e": "md5",
+        "da39a3ee5e6b4b0d3255bfef95601890afd80709": "sha1",
+        "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855": "sha256",
+    }
+    for value, expected in cases.items():
+        assert sniff_ioc_type(value) == expected, value
+
+
+def test_sniff_ioc_type_rejects_malformed_values():
+    for value in ("", "   ", "hello", "999.1.1.1", "2001:db8::1::2", "10.0.0.1:8080",
+                  "https://a b", "cve-2024-1", "a" * 3000):
+        assert sniff_ioc_type(value) is None, value
+
+
+def test_map_indicator_type_sniffs_unknown_otx_types():
+    agent = OTXAgent(api_key=None)
+    assert agent.map_indicator_type("IPv4", "203.0.113.7") == "ipv4-addr:value"
+    assert agent.map_indicator_type("", "evil.example.com") == "domain-name:value"
+    assert agent.map_indicator_type("Mutex", "Global\\evil") == "artifact:payload_bin"
+
+
+def test_normalize_landscape_collapses_duplicates():
+    landscape = {
+        "indicators": [
+            indicator("203.0.113.7", "APT-Southeast-Banking"),
+            indicator("203.0.113.7", "Jakarta Phishing"),
+            indicator("203.0.113.7", "APT-Southeast-Banking"),
+            indicator("198.51.100.2", "Jakarta Phishing"),
+        ],
+        "vulnerabilities": [
+            vulnerability("CVE-2024-21234", refs=["GitHub Advisory"]),
+            vulnerability("cve-2024-21234", cvss=9.8, severity="CRITICAL", refs=["NVD"]),
+            vulnerability("CVE-2024-3456", cvss=7.5, severity="HIGH", refs=["NVD"]),
+        ],
+    }
+    normalize_landscape(landscape)
+
+    assert landscape["total_items"] == 4
+    first_ioc = landscape["indicators"][0]
+    assert first_ioc["indicator"] == "203.0.113.7"
+    assert first_ioc["x_pulses"] == ["APT-Southeast-Banking", "Jakarta Phishing"]
+
+    # The kept copy is the first one seen, filled in with the duplicate's CVSS data and references
+    cve = landscape["vulnerabilities"][0]
+    assert cve["name"] == "CVE-2024-21234"
+    assert (cve["x_cvss_score"], cve["x_severity"]) == (9.8, "CRITICAL")
+    assert [ref["source_name"] for ref in cve["external_references"]] == ["GitHub Advisory", "NVD"]
+
+
+def test_normalize_landscape_keeps_existing_cvss():
+    landscape = {"vulnerabilities": [
+        vulnerability("CVE-2024-3456", cvss=7.5, severity="HIGH"),
+        vulnerability("CVE-2024-3456", cvss=5.0, severity="MEDIUM"),
+    ]}
+    normalize_landscape(landscape)
+    assert landscape["vulnerabilities"][0]["x_cvss_score"] == 7.5
+    assert landscape["indicators"] == []
+
+
+class StaticAgent(BaseAgent):
+    """Agent whose feed is a fixed list of already-processed items."""
+
+    def __init__(self, items):
+        super().__init__()
+        self.items = items
+
+    def collect(self):
+        return self.items
+
+    def process(self, raw_data, timestamp=None):
+        return raw_data
+
+
+def test_threat_key():
+    assert threat_key(vulnerability("cve-2024-21234")) == ("vulnerability", "CVE-2024-21234")
+    assert threat_key({"type": "vulnerability", "id": "ghsa-abcd"}) == ("vulnerability", "GHSA-ABCD")
+    assert threat_key(indicator("Evil.Example.com", "p", "domain")) == ("domain", "evil.example.com")
+    # Same value under different types stays distinct
+    assert threat_key(indicator("203.0.113.7", "p")) != threat_key(indicator("203.0.113.7", "p", "hostname"))
+
+
+def test_stream_threats_yields_first_occurrences_with_merged_data():
+    builder = ThreatLandscapeBuilder([
+        StaticAgent([vulnerability("CVE-2024-21234"), indicator("203.0.113.7", "APT-Southeast-Banking")]),
+        StaticAgent([vulnerability("CVE-2024-21234", cvss=9.8, severity="CRITICAL"),
+                     indicator("203.0.113.7", "Jakarta Phishing")]),
+    ])
+
+    async def collect():
+        return [item async for item in builder.stream_threats()]
+
+    streamed = asyncio.run(collect())
+    assert len(streamed) == 2
+    vuln = next(item for item in streamed if item["type"] == "vulnerability")
+    ioc = next(item for item in streamed if item["type"] == "IPv4")
+    # Later duplicates are merged into the copy already yielded
+    assert vuln["x_cvss_score"] == 9.8
+    assert sorted(ioc["x_pulses"]) == ["APT-Southeast-Banking", "Jakarta Phishing"]
+
+
+def test_merge_dedupes_across_agents_and_skips_failures():
+    nvd = StaticAgent([vulnerability("CVE-2024-21234", cvss=9.8, severity="CRITICAL", refs=["NVD"])])
+    github = StaticAgent([vulnerability("CVE-2024-21234", refs=["GitHub Advisory"])])
+    otx = OTXAgent(api_key=None)
+    builder = ThreatLandscapeBuilder([nvd, github, otx], pir_keywords={"technologies": ["aws"]})
+
+    landscape = builder.merge([
+        (nvd, nvd.items),
+        (github, github.items),
+        (otx, ConnectionError("OTX unreachable")),
+    ])
+
+    assert landscape["total_items"] == 1
+    assert landscape["sources"] == ["StaticAgent", "StaticAgent"]
+    assert landscape["keywords"] == {"technologies": ["aws"]}
+    cve = landscape["vulnerabilities"][0]
+    assert cve["x_cvss_score"] == 9.8
+    assert [ref["source_name"] for ref in cve["external_references"]] == ["NVD", "GitHub Advisory"]
+
+
+if __name__ == "__main__":
+    test_sniff_ioc_type()
+    test_sniff_ioc_type_rejects_malformed_values()
+    test_map_indicator_type_sniffs_unknown_otx_types()
+    test_normalize_landscape_collapses_duplicates()
+    test_normalize_landscape_keeps_existing_cvss()
+    test_threat_key()
+    test_stream_threats_yields_first_occurrences_with_merged_data()
+    test_merge_dedupes_across_agents_and_skips_failures()
+    print("✅ collection agent tests passed")
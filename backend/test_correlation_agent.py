@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Correlation agent tests: JSON-mode assessment parsing and mapping batched replies back onto
+their threats (no Neo4j or OpenAI calls)
+"""
+
+import os
+
+# The module builds its ChatOpenAI client at import; no request is made in these tests
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from pydantic import ValidationError
+
+from app.services.correlation_agent import CorrelationAgent, RiskAssessment, WindowAssessment
+
+WINDOW = [
+    ("vulnerability", {"name": "CVE-2024-21234", "x_severity": "CRITICAL"}),
+    ("indicator", {"name": "APT-Southeast-Banking"}),
+    ("vulnerability", {"name": "CVE-2024-3456", "x_severity": "HIGH"}),
+]
+
+
+def offline_agent(fallback_calls):
+    """CorrelationAgent without a Neo4j connection whose per-threat fallback is recorded, not sent."""
+    agent = CorrelationAgent.__new__(CorrelationAgent)
+
+    def assess_single(threat_type, threat, system_prompt):
+        fallback_calls.append(threat["name"])
+        return {"risk_score": 1, "threat_type": threat_type, "threat_id": threat["name"], "fallback": True}
+
+    agent._assess_single = assess_single
+    return agent
+
+
+def test_risk_assessment_scores_are_rounded_and_clamped():
+    assert RiskAssessment.model_validate_json('{"risk_score": 7.5}').as_dict()["risk_score"] == 8
+    assert RiskAssessment.model_validate_json('{"risk_score": 14}').as_dict()["risk_score"] == 10
+    assert RiskAssessment.model_validate_json('{"risk_score": -2}').as_dict()["risk_score"] == 0
+    assert RiskAssessment.model_validate_json('{}').as_dict()["risk_score"] == 0
+
+
+def test_window_assessment_parsing():
+    reply = WindowAssessment.model_validate_json(
+        '{"assessments": [{"index": 1, "risk_score": 6, "affected_assets": ["Jakarta branch"]},'
+        ' {"index": 0, "risk_score": 9, "business_impact": "Cluster takeover"}]}'
+    )
+    assert [item.index for item in reply.assessments] == [1, 0]
+    assert "index" not in reply.assessments[0].as_dict()
+    assert WindowAssessment.model_validate_json("{}").assessments == []
+
+    for bad in ('{"assessments": [{"risk_score": 5}]}', '{"assessments": [{"index": 0, "risk_score": "high"}]}', "not json"):
+        try:
+            WindowAssessment.model_validate_json(bad)
+        except ValidationError:
+            continue
+        raise AssertionError(f"accepted {bad!r}")
+
+
+def test_window_indices_map_back_onto_threats():
+    fallback_calls = []
+    reply = WindowAssessment.model_validate_json(
+        '{"assessments": [{"index": 2, "risk_score": 4}, {"index": 0, "risk_score": 9}]}'
+    )
+    results = offline_agent(fallback_calls)._parse_window_response(WINDOW, reply, "system")
+
+    assert [r["threat_id"] for r in results] == ["CVE-2024-21234", "APT-Southeast-Banking", "CVE-2024-3456"]
+    assert [r["risk_score"] for r in results] == [9, 1, 4]
+    assert results[0]["original_severity"] == "CRITICAL"
+    # Only the threat the reply missed is assessed individually
+    assert fallback_calls == ["APT-Southeast-Banking"]
+    assert results[1]["fallback"]
+
+
+def test_failed_window_falls_back_for_every_threat():
+    fallback_calls = []
+    results = offline_agent(fallback_calls)._parse_window_response(WINDOW, TimeoutError("rate limited"), "system")
+    assert sorted(fallback_calls) == sorted(threat["name"] for _, threat in WINDOW)
+    assert all(r["fallback"] for r in results)
+
+
+if __name__ == "__main__":
+    test_risk_assessment_scores_are_rounded_and_clamped()
+    test_window_assessment_parsing()
+    test_window_indices_map_back_onto_threats()
+    test_failed_window_falls_back_for_every_threat()
+    print("✅ correlation agent tests passed")
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Document index tests: per-file content hashes and change detection between org-DNA builds
+"""
+
+import os
+import tempfile
+
+from langchain.schema import Document
+
+from app.services.document_index import DocumentIndex, hash_documents_by_file
+
+
+def chunk(file_name, text):
+    return Document(page_content=text, metadata={"file_name": file_name})
+
+
+def test_hash_documents_by_file():
+    hashes = hash_documents_by_file([
+        chunk("strategy.pdf", "Expand into Jakarta"),
+        chunk("stack.docx", "We run PostgreSQL"),
+        chunk("strategy.pdf", "Migrate to AWS"),
+    ])
+    assert set(hashes) == {"strategy.pdf", "stack.docx"}
+
+    # Chunk boundaries are part of the content
+    rejoined = hash_documents_by_file([chunk("strategy.pdf", "Expand into JakartaMigrate to AWS")])
+    assert rejoined["strategy.pdf"] != hashes["strategy.pdf"]
+
+    same = hash_documents_by_file([chunk("strategy.pdf", "Expand into Jakarta"), chunk("strategy.pdf", "Migrate to AWS")])
+    assert same["strategy.pdf"] == hashes["strategy.pdf"]
+
+
+def test_changed_files_record_and_clear():
+    with tempfile.TemporaryDirectory() as directory:
+        index = DocumentIndex(os.path.join(directory, "index.sqlite"))
+        first = {"strategy.pdf": "a1", "stack.docx": "b1"}
+        assert sorted(index.changed_files(first)) == ["stack.docx", "strategy.pdf"]
+
+        index.record(first)
+        assert index.changed_files(first) == []
+        assert index.changed_files({"strategy.pdf": "a2", "stack.docx": "b1"}) == ["strategy.pdf"]
+        assert index.changed_files({"new.txt": "c1"}) == ["new.txt"]
+
+        # Records survive reopening the index
+        assert DocumentIndex(index.path).changed_files(first) == []
+
+        index.clear()
+        assert sorted(index.changed_files(first)) == ["stack.docx", "strategy.pdf"]
+
+
+if __name__ == "__main__":
+    test_hash_documents_by_file()
+    test_changed_files_record_and_clear()
+    print("✅ document index tests passed")
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+FeedCache tests: TTL expiry, query keying and size-limit eviction
+"""
+
+import os
+import tempfile
+import time
+
+from app.services.feed_cache import FeedCache
+
+
+def age_entry(cache, source, query, seconds):
+    """Backdate a cache file's mtime, which is what the TTL is measured against."""
+    path = cache._path(source, query)
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def test_round_trip_and_query_keying():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = FeedCache(directory)
+        cache.set("cve", {"keyword": "aws", "limit": 50}, [{"id": "CVE-2024-0001"}])
+        # Key order in the query does not matter
+        assert cache.get("cve", {"limit": 50, "keyword": "aws"}, ttl=60) == [{"id": "CVE-2024-0001"}]
+        assert cache.get("cve", {"keyword": "azure", "limit": 50}, ttl=60) is None
+        assert cache.get("otx", {"keyword": "aws", "limit": 50}, ttl=60) is None
+
+
+def test_entries_expire_after_ttl():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = FeedCache(directory)
+        cache.set("otx", {"limit": 50}, [{"name": "pulse"}])
+        age_entry(cache, "otx", {"limit": 50}, 120)
+        assert cache.get("otx", {"limit": 50}, ttl=60) is None
+        assert cache.get("otx", {"limit": 50}, ttl=600) == [{"name": "pulse"}]
+
+
+def test_missing_or_corrupt_entries_read_as_misses():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = FeedCache(directory)
+        assert cache.get("github", {"first": 50}, ttl=60) is None
+        with open(cache._path("github", {"first": 50}), "wb") as fh:
+            fh.write(b"not zlib")
+        assert cache.get("github", {"first": 50}, ttl=60) is None
+
+
+def test_oldest_entries_evicted_over_size_limit():
+    with tempfile.TemporaryDirectory() as directory:
+        # Incompressible-ish payloads so each entry is a few KB on disk
+        payload = [os.urandom(2048).hex()]
+        cache = FeedCache(directory, size_limit=10 ** 9)
+        for i in range(3):
+            cache.set("cve", {"page": i}, payload)
+            age_entry(cache, "cve", {"page": i}, 300 - i * 100)
+        entry_size = os.path.getsize(cache._path("cve", {"page": 0}))
+
+        cache.size_limit = entry_size * 2 + entry_size // 2
+        cache.set("cve", {"page": 3}, payload)
+
+        assert cache.get("cve", {"page": 0}, ttl=3600) is None
+        assert cache.get("cve", {"page": 1}, ttl=3600) is None
+        assert cache.get("cve", {"page": 2}, ttl=3600) == payload
+        assert cache.get("cve", {"page": 3}, ttl=3600) == payload
+
+
+if __name__ == "__main__":
+    test_round_trip_and_query_keying()
+    test_entries_expire_after_ttl()
+    test_missing_or_corrupt_entries_read_as_misses()
+    test_oldest_entries_evicted_over_size_limit()
+    print("✅ feed cache tests passed")
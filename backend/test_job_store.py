@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Background job store tests: stage progress, completion/failure and TTL eviction of finished jobs
+"""
+
+import time
+
+from app.services import job_store
+
+
+def test_job_lifecycle():
+    job_id = job_store.create_job(stages=4)
+    job = job_store.get_job(job_id)
+    assert job["status"] == "queued" and job["progress"] == 0.0
+
+    job_store.update_stage(job_id, 1, {"keywords": ["aws"]}, stage_name="pirs")
+    job_store.update_stage(job_id, 2, {"threats": 12})
+    job = job_store.get_job(job_id)
+    assert job["status"] == "running"
+    assert job["stage_name"] == "pirs"
+    assert job["progress"] == 0.5
+    assert job["partial_result"] == {"keywords": ["aws"], "threats": 12}
+
+    job_store.complete_job(job_id, {"risks": []})
+    job = job_store.get_job(job_id)
+    assert job["status"] == "completed" and job["progress"] == 1.0
+    assert job["result"] == {"risks": []}
+
+
+def test_failed_job_and_unknown_ids():
+    job_id = job_store.create_job()
+    job_store.fail_job(job_id, "Neo4j unavailable")
+    job = job_store.get_job(job_id)
+    assert job["status"] == "failed" and job["error"] == "Neo4j unavailable"
+
+    assert job_store.get_job("missing") is None
+    # Updates for unknown jobs are ignored
+    job_store.update_stage("missing", 1)
+    job_store.complete_job("missing", {})
+
+
+def test_get_job_returns_a_copy():
+    job_id = job_store.create_job()
+    job_store.get_job(job_id)["status"] = "completed"
+    assert job_store.get_job(job_id)["status"] == "queued"
+
+
+def test_finished_jobs_evicted_after_ttl():
+    finished = job_store.create_job()
+    job_store.complete_job(finished, {})
+    failed = job_store.create_job()
+    job_store.fail_job(failed, "boom")
+    running = job_store.create_job()
+    job_store.update_stage(running, 1)
+
+    # Age every job past the TTL; only the finished ones may go
+    with job_store._LOCK:
+        for job_id in (finished, failed, running):
+            job_store._JOBS[job_id]["updated_at"] = time.time() - job_store.JOB_TTL_SECONDS - 1
+
+    assert job_store.get_job(finished) is None
+    assert job_store.get_job(failed) is None
+    assert job_store.get_job(running)["status"] == "running"
+
+
+if __name__ == "__main__":
+    test_job_lifecycle()
+    test_failed_job_and_unknown_ids()
+    test_get_job_returns_a_copy()
+    test_finished_jobs_evicted_after_ttl()
+    print("✅ job store tests passed")
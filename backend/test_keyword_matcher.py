@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+KeywordMatcher tests: every backend must agree with the substring loop it replaced
+"""
+
+import random
+
+from app.services import keyword_matcher
+from app.services.keyword_matcher import KeywordMatcher, get_matcher
+
+BACKENDS = ("hyperscan", "ahocorasick", "regex")
+
+
+def build_matcher(backend, keywords):
+    """KeywordMatcher compiled with only `backend` (and the slower fallbacks) available."""
+    saved = keyword_matcher.hyperscan, keyword_matcher.ahocorasick
+    try:
+        if backend != "hyperscan":
+            keyword_matcher.hyperscan = None
+        if backend == "regex":
+            keyword_matcher.ahocorasick = None
+        return KeywordMatcher(keywords)
+    finally:
+        keyword_matcher.hyperscan, keyword_matcher.ahocorasick = saved
+
+
+def available_backends():
+    return [b for b in BACKENDS if b == "regex" or getattr(keyword_matcher, b) is not None]
+
+
+def substring_loop(keywords, text):
+    """The original filter: any(kw in text.lower() for kw in dna_keywords)."""
+    return {kw.lower() for kw in keywords if kw and kw.lower() in text.lower()}
+
+
+def test_matches_and_find_agree_with_substring_loop():
+    rng = random.Random(7)
+    for _ in range(300):
+        keywords = {"".join(rng.choices("abÄä-", k=rng.randint(1, 4))) for _ in range(6)}
+        text = "".join(rng.choices("abÄäX -", k=40))
+        expected = substring_loop(keywords, text)
+        for backend in available_backends():
+            matcher = build_matcher(backend, keywords)
+            assert matcher.find(text) == expected, (backend, keywords, text)
+            assert matcher.matches(text) == bool(expected), (backend, keywords, text)
+
+
+def test_overlapping_and_prefix_keywords():
+    keywords = {"post", "postgres", "postgresql", "sql", "gres"}
+    text = "Upgrade PostgreSQL now"
+    for backend in available_backends():
+        assert build_matcher(backend, keywords).find(text) == keywords, backend
+
+
+def test_non_ascii_case_folding():
+    for backend in available_backends():
+        matcher = build_matcher(backend, {"münchen"})
+        assert matcher.matches("Office in MÜNCHEN"), backend
+
+
+def test_empty_inputs():
+    for backend in available_backends():
+        assert not build_matcher(backend, set()).matches("anything")
+        assert build_matcher(backend, {"aws"}).find("") == set()
+
+
+def test_matches_any_stops_on_first_matching_field():
+    matcher = KeywordMatcher({"kubernetes"})
+    assert matcher.matches_any(("nothing here", "Kubernetes API server"))
+    assert not matcher.matches_any(("nothing here", ""))
+
+
+def test_get_matcher_reuses_compiled_matcher():
+    assert get_matcher(["AWS", "Redis"]) is get_matcher(["redis", "aws"])
+
+
+if __name__ == "__main__":
+    test_matches_and_find_agree_with_substring_loop()
+    test_overlapping_and_prefix_keywords()
+    test_non_ascii_case_folding()
+    test_empty_inputs()
+    test_matches_any_stops_on_first_matching_field()
+    test_get_matcher_reuses_compiled_matcher()
+    print("✅ keyword matcher tests passed")
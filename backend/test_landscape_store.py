@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Landscape Parquet export tests: column flattening and a write/read round trip (needs pyarrow)
+"""
+
+import os
+import tempfile
+from datetime import datetime
+
+from app.services.landscape_store import (
+    landscape_to_columns, parquet_available, read_landscape_table, write_landscape_parquet
+)
+
+LANDSCAPE = {
+    "vulnerabilities": [
+        {
+            "type": "vulnerability",
+            "name": "CVE-2024-21234",
+            "x_cvss_score": 9.8,
+            "created": "2024-05-01T10:00:00.000Z",
+            "external_references": [{"source_name": "NVD"}],
+        },
+        {
+            "type": "vulnerability",
+            "name": "GHSA-abcd-1234-efgh",
+            "x_affected_packages": ["npm/lodash"],
+        },
+    ],
+    "indicators": [
+        {
+            "type": "IPv4",
+            "indicator": "203.0.113.7",
+            "pulse": "APT-Southeast-Banking",
+            "confidence": 80,
+            "created": "2024-05-02T08:30:00",
+            "x_pulses": ["APT-Southeast-Banking", "Jakarta Phishing"],
+        },
+    ],
+}
+
+
+def test_landscape_to_columns():
+    columns = landscape_to_columns(LANDSCAPE)
+    assert columns["type"] == ["vulnerability", "vulnerability", "IPv4"]
+    assert columns["source"] == ["NVD", "", "APT-Southeast-Banking"]
+    assert columns["cve_id"] == ["CVE-2024-21234", None, None]
+    # STIX confidence when present, else CVSS scaled to 0-100
+    assert columns["confidence"] == [98, None, 80]
+    assert columns["first_seen"] == [datetime(2024, 5, 1, 10), None, datetime(2024, 5, 2, 8, 30)]
+    assert columns["tags"] == [[], ["npm/lodash"], ["APT-Southeast-Banking", "Jakarta Phishing"]]
+
+
+def test_parquet_round_trip():
+    if not parquet_available():
+        print("⚠️  pyarrow not installed - skipping Parquet round trip")
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        path = write_landscape_parquet(LANDSCAPE, os.path.join(directory, "landscape.parquet"))
+        table = read_landscape_table(path, columns=["type", "value", "confidence"])
+        assert table.num_rows == 3
+        assert table.column_names == ["type", "value", "confidence"]
+        assert table.column("value").to_pylist() == ["CVE-2024-21234", "GHSA-abcd-1234-efgh", "203.0.113.7"]
+
+
+if __name__ == "__main__":
+    test_landscape_to_columns()
+    test_parquet_round_trip()
+    print("✅ landscape store tests passed")
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Provider health gate tests: providers degrade on errors or slow responses and recover once
+the bad samples leave the rolling window
+"""
+
+from app.services import provider_health
+from app.services.collection_agent import BaseAgent
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def with_fake_clock(test):
+    """Run test(clock) against a controllable monotonic clock and an empty provider table."""
+    saved_time = provider_health.time
+    clock = FakeClock()
+    provider_health.time = clock
+    provider_health._PROVIDERS.clear()
+    try:
+        test(clock)
+    finally:
+        provider_health.time = saved_time
+        provider_health._PROVIDERS.clear()
+
+
+def test_unknown_or_sparse_provider_is_healthy():
+    def run(clock):
+        assert provider_health.is_healthy("OTXAgent")
+        provider_health.record("OTXAgent", 0.5, ok=False)
+        # A single failure is below MIN_SAMPLES
+        assert provider_health.is_healthy("OTXAgent")
+    with_fake_clock(run)
+
+
+def test_degrades_on_errors_and_recovers_after_window():
+    def run(clock):
+        for _ in range(3):
+            provider_health.record("CVEAgent", 0.5, ok=False)
+        provider_health.record("CVEAgent", 0.5, ok=True)
+        assert not provider_health.is_healthy("CVEAgent")
+        assert provider_health.degraded(["CVEAgent", "OTXAgent"]) == ["CVEAgent"]
+
+        clock.now += provider_health.HEALTH_WINDOW_SECONDS + 1
+        assert provider_health.is_healthy("CVEAgent")
+        assert provider_health.degraded(["CVEAgent", "OTXAgent"]) == []
+    with_fake_clock(run)
+
+
+def test_degrades_on_slow_responses():
+    def run(clock):
+        slow = provider_health.LATENCY_SLA_SECONDS + 5
+        for _ in range(3):
+            provider_health.record("GitHubSecurityAgent", slow, ok=True)
+        assert not provider_health.is_healthy("GitHubSecurityAgent")
+
+        clock.now += provider_health.HEALTH_WINDOW_SECONDS + 1
+        for _ in range(3):
+            provider_health.record("GitHubSecurityAgent", 0.2, ok=True)
+        assert provider_health.is_healthy("GitHubSecurityAgent")
+    with_fake_clock(run)
+
+
+def test_snapshot_reports_window_and_lifetime_counters():
+    def run(clock):
+        provider_health.record("OTXAgent", 1.0, ok=True)
+        provider_health.record("OTXAgent", 3.0, ok=False)
+        clock.now += provider_health.HEALTH_WINDOW_SECONDS + 1
+        provider_health.record("OTXAgent", 2.0, ok=True)
+
+        stats = provider_health.snapshot()["OTXAgent"]
+        assert stats["samples"] == 1
+        assert stats["error_rate"] == 0.0
+        assert stats["total_calls"] == 3
+        assert stats["total_errors"] == 1
+        assert stats["total_latency"] == 6.0
+    with_fake_clock(run)
+
+
+class EmptyFeedAgent(BaseAgent):
+    def collect(self):
+        return None
+
+
+class FailingFeedAgent(BaseAgent):
+    def collect(self):
+        self.fetch_errors += 1
+        return None
+
+
+def test_agent_run_counts_only_fetch_errors():
+    def run(clock):
+        for _ in range(3):
+            EmptyFeedAgent().run()
+            FailingFeedAgent().run()
+        # A quiet feed is not an outage; a request/API error is
+        assert provider_health.is_healthy("EmptyFeedAgent")
+        assert not provider_health.is_healthy("FailingFeedAgent")
+    with_fake_clock(run)
+
+
+if __name__ == "__main__":
+    test_unknown_or_sparse_provider_is_healthy()
+    test_degrades_on_errors_and_recovers_after_window()
+    test_degrades_on_slow_responses()
+    test_snapshot_reports_window_and_lifetime_counters()
+    test_agent_run_counts_only_fetch_errors()
+    print("✅ provider health tests passed")